@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
 from app.api.routes.events import router as events_router
+from app.api.routes.ingest import router as ingest_router
 
 
 router = APIRouter()
 
 
 router.include_router(events_router, prefix="/events", tags=["events"])
+router.include_router(ingest_router, prefix="/ingest", tags=["ingest"])
@@ -1,15 +1,40 @@
-from typing import List
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, Body, Depends
-from starlette.status import HTTP_201_CREATED, HTTP_200_OK
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.status import HTTP_201_CREATED, HTTP_200_OK, HTTP_400_BAD_REQUEST
 
-from app.models.events import EventsCreate, EventsInDB, EventsPublic
-from app.db.repositories.events import EventsRepository
+from app.models.events import (
+    CategoryType, EventRow, EventsBulkDeleteResult, EventsBulkUpsertResult, EventsCacheStats, EventsCreate, EventsFilter, EventsPublic,
+)
+from app.db.repositories.events import EventsRepository, InvalidCursor, decode_cursor, encode_cursor
 from app.api.dependencies.database import get_repository
+from app.core.cache import CachedResponse, events_cache, events_changed
+from app.core.concurrency import (
+    ConcurrencyLimiter, events_flights, events_limiter, events_stream_limiter, nearest_events_limiter,
+)
+from app.core.serialisation import encode_event_row_line, encode_event_rows
+from app.core.versions import VersionSnapshot, events_version, not_modified, set_validators
 
 
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+
+def cached_json_response(
+    request: Request, cached: CachedResponse, version: Optional[VersionSnapshot], extra: str = ""
+) -> Response:
+    """`version` is the one the rows were read at, which a write during the query may have moved on from."""
+    response = Response(content=cached.body, media_type=JSON_MEDIA_TYPE, headers=cached.headers)
+    set_validators(request, response, version, extra)
+    return response
+
 
 @router.post("/", response_model=EventsPublic, name="events:create-events", status_code=HTTP_201_CREATED)
 async def create_new_events(
@@ -17,19 +42,176 @@ async def create_new_events(
     events_repo: EventsRepository = Depends(get_repository(EventsRepository)),
 ) -> EventsPublic:
     created_events = await events_repo.create_events(new_events=new_events)
+    await events_changed(events_repo.db)
 
     return created_events
 
+@router.post("/bulk", response_model=EventsBulkUpsertResult, name="events:upsert-events", status_code=HTTP_200_OK)
+async def upsert_events(
+    new_events: List[EventsCreate] = Body(..., embed=True),
+    events_repo: EventsRepository = Depends(get_repository(EventsRepository)),
+) -> EventsBulkUpsertResult:
+    result = await events_repo.upsert_events(new_events=new_events)
+    if result.inserted or result.updated:
+        await events_changed(events_repo.db)
+    return result
+
+@router.get("/onepa-hashes", response_model=Dict[int, Optional[str]], name="events:get-onepa-hashes", status_code=HTTP_200_OK)
+async def get_onepa_hashes(
+    events_repo: EventsRepository = Depends(get_repository(EventsRepository)),
+) -> Dict[int, Optional[str]]:
+    """
+    Content hash of every stored onepa event by eventId, so ingestion only sends what changed.
+    """
+    return await events_repo.get_onepa_hashes()
+
+@router.delete("/onepa", response_model=EventsBulkDeleteResult, name="events:delete-onepa-events", status_code=HTTP_200_OK)
+async def delete_onepa_events(
+    onepa_eventids: List[int] = Body(..., embed=True),
+    events_repo: EventsRepository = Depends(get_repository(EventsRepository)),
+) -> EventsBulkDeleteResult:
+    result = await events_repo.delete_onepa_events(onepa_eventids=onepa_eventids)
+    if result.deleted:
+        await events_changed(events_repo.db)
+    return result
+
 @router.get("/", response_model=List[EventsPublic], name="events:get-events", status_code=HTTP_200_OK)
 async def get_events(
+    request: Request,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = Query(None, gt=0),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    category: Optional[CategoryType] = None,
+    kampong: Optional[str] = None,
+    limit: Optional[int] = Query(None, gt=0, le=500),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    accept: Optional[str] = Header(None),
+    events_repo: EventsRepository = Depends(get_repository(EventsRepository)),
+) -> List[EventsPublic]:
+    """
+    `kampong` keeps events whose nearest community club or residents' committee has that name.
+
+    With `limit`, the token for the following page is sent back in the X-Next-Cursor header
+    and passed in as `cursor`. The header is absent on the last page.
+
+    `stream=1` or `Accept: application/x-ndjson` streams one event per line as rows are read
+    from the database. Streamed responses don't carry X-Next-Cursor.
+
+    Responses carry ETag/Last-Modified; a matching If-None-Match gets 304 without querying the database.
+    Buffered responses are served from events_cache until the next write through any api process.
+    Concurrent identical misses share one database query, and past EVENTS_MAX_CONCURRENT_QUERIES the
+    route sheds load with 503. Open streams count against EVENTS_MAX_CONCURRENT_STREAMS until they end.
+    """
+    if (lat is None) != (lng is None):
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="lat and lng must be given together")
+    if radius_km is not None and lat is None:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="radius_km requires lat and lng")
+
+    filters = EventsFilter(
+        lat=lat, lng=lng, radius_km=radius_km, start=start, end=end, category=category, kampong=kampong,
+    )
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, is_geo_query=filters.is_geo_query)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+
+    version = events_version.snapshot()
+    cached = not_modified(request, version)
+    if cached is not None:
+        return cached
+
+    if stream or (accept is not None and NDJSON_MEDIA_TYPE in accept):
+        # taken here so an overloaded server can still answer 503, and given back when the stream ends
+        events_stream_limiter.acquire()
+        events = events_repo.iterate_events(filters=filters, limit=limit, after=after)
+        streaming_response = StreamingResponse(
+            stream_ndjson(events, events_stream_limiter), media_type=NDJSON_MEDIA_TYPE
+        )
+        set_validators(request, streaming_response, version)
+        return streaming_response
+
+    cache_key = ("events", filters.json(), limit, cursor)
+    cached = events_cache.get(cache_key, version)
+    if cached is None:
+        async def fetch() -> CachedResponse:
+            async with events_limiter:
+                # one extra row tells us whether there is a next page
+                events = await events_repo.get_events(
+                    filters=filters, limit=limit + 1 if limit is not None else None, after=after,
+                )
+            headers = {}
+            if limit is not None and len(events) > limit:
+                events = events[:limit]
+                headers[NEXT_CURSOR_HEADER] = encode_cursor(events[-1], is_geo_query=filters.is_geo_query)
+            response = CachedResponse(body=encode_event_rows(events), headers=headers)
+            events_cache.put(cache_key, version, response)
+            return response
+
+        cached = await events_flights.do((cache_key, version), fetch)
+
+    return cached_json_response(request, cached, version)
+
+async def stream_ndjson(events: AsyncIterator[EventRow], limiter: ConcurrencyLimiter) -> AsyncIterator[bytes]:
+    """Holds the slot of `limiter` its caller took, and the pool connection, until the client is done."""
+    try:
+        async for event in events:
+            yield encode_event_row_line(event)
+    finally:
+        limiter.release()
+
+@router.get("/nearest", response_model=List[EventsPublic], name="events:get-nearest-events", status_code=HTTP_200_OK)
+async def get_nearest_events(
+    request: Request,
+    lat: float,
+    lng: float,
+    k: int = Query(3, gt=0, le=50),
+    category: Optional[CategoryType] = None,
+    within_days: Optional[int] = Query(None, gt=0),
     events_repo: EventsRepository = Depends(get_repository(EventsRepository)),
 ) -> List[EventsPublic]:
-    events = await events_repo.get_events()
-    return list(events)
+    # "the next n days" moves with the clock, so those validators also roll over every minute
+    clock = str(int(time.time() // 60)) if within_days is not None else ""
+    version = events_version.snapshot()
+    cached = not_modified(request, version, clock)
+    if cached is not None:
+        return cached
+
+    cache_key = ("nearest", lat, lng, k, category, within_days, clock)
+    cached = events_cache.get(cache_key, version)
+    if cached is None:
+        async def fetch() -> CachedResponse:
+            async with nearest_events_limiter:
+                events = await events_repo.get_nearest_events(
+                    lat=lat, lng=lng, k=k, category=category, within_days=within_days,
+                )
+            response = CachedResponse(body=encode_event_rows(events), headers={})
+            events_cache.put(cache_key, version, response)
+            return response
+
+        cached = await events_flights.do((cache_key, version), fetch)
+
+    return cached_json_response(request, cached, version, clock)
+
+@router.get("/cache-stats", response_model=EventsCacheStats, name="events:get-cache-stats", status_code=HTTP_200_OK)
+async def get_cache_stats() -> EventsCacheStats:
+    flights = events_flights.stats()
+    limiters = [events_limiter, nearest_events_limiter, events_stream_limiter]
+    return EventsCacheStats(
+        **events_cache.stats(),
+        in_flight_queries=flights["in_flight"],
+        coalesced_queries=flights["followers"],
+        rejected_queries=sum(limiter.rejected for limiter in limiters),
+    )
 
 @router.delete("/", response_model=None, name="events:delete-events", status_code=HTTP_200_OK)
 async def delete_events(
     events_repo: EventsRepository = Depends(get_repository(EventsRepository)),
 ) -> None:
     await events_repo.delete_events()
-    return None
\ No newline at end of file
+    await events_changed(events_repo.db)
+    return None
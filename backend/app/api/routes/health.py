@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.status import HTTP_200_OK, HTTP_503_SERVICE_UNAVAILABLE
+
+
+router = APIRouter()
+
+
+@router.get("/health", name="health:get-health", status_code=HTTP_200_OK)
+async def get_health(request: Request) -> JSONResponse:
+    """
+    Readiness probe: ready once the database answers. Doesn't wait on onepa ingestion.
+    """
+    db = getattr(request.app.state, "_db", None)
+    if db is None:
+        return JSONResponse({"status": "unavailable", "detail": "database not connected"}, status_code=HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        await db.execute("SELECT 1")
+    except Exception as e:
+        return JSONResponse({"status": "unavailable", "detail": str(e)}, status_code=HTTP_503_SERVICE_UNAVAILABLE)
+    return JSONResponse({"status": "ok"})
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from starlette.status import HTTP_200_OK
+
+from app.background.ingest_worker import ingestion_worker
+from app.models.ingestion import IngestionStatus
+
+
+router = APIRouter()
+
+
+@router.get("/status", response_model=IngestionStatus, name="ingest:get-status", status_code=HTTP_200_OK)
+async def get_ingestion_status() -> IngestionStatus:
+    return ingestion_worker.status()
@@ -1,13 +1,16 @@
-from datetime import datetime
 from fastapi import FastAPI
 from fastapi_utils.tasks import repeat_every
 from starlette.middleware.cors import CORSMiddleware
 
 from app.core import config, tasks
-from app.background.scrape_onepa import update_onepa_events
+from app.core.cache import events_changed
+from app.background.ingest_worker import ingestion_worker
+from app.background.archive_events import maintain_event_partitions
+from app.background.scheduler import run_scheduled_job
 
 import logging
 from app.api.routes import router as api_router
+from app.api.routes.health import router as health_router
 
 
 def get_application():
@@ -18,12 +21,14 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
     app.add_event_handler("startup", tasks.create_start_app_handler(app))
     app.add_event_handler("shutdown", tasks.create_stop_app_handler(app))
 
     app.include_router(api_router, prefix="/api")
+    app.include_router(health_router)
 
     return app
 
@@ -32,11 +37,33 @@ app = get_application()
 
 
 @app.on_event("startup")
-@repeat_every(seconds=60 * 60 * 24)  # Daily
-def update_db_with_onepa_events() -> None:
-    start = datetime.now()
-    logging.info(f"Running daily update of onepa events at {start}")
-    update_onepa_events()
-    end = datetime.now()
-    seconds = (end - start).seconds
-    logging.info(f"Finished daily update of onepa events at {end} after {seconds} seconds")
+def load_last_ingestion_run() -> None:
+    ingestion_worker.load_last_run()
+
+
+@app.on_event("startup")
+@repeat_every(seconds=config.SCHEDULER_TICK_SECONDS)
+async def update_db_with_onepa_events() -> None:
+    # runs on the ingestion worker's thread, startup and requests don't wait for it
+    await run_scheduled_job(
+        app.state._db, "onepa-ingestion", config.ONEPA_INGESTION_INTERVAL_SECONDS, ingestion_worker.run
+    )
+
+
+@app.on_event("shutdown")
+def stop_ingestion_worker() -> None:
+    ingestion_worker.shutdown()
+
+
+async def maintain_partitions() -> None:
+    logging.info("Running maintenance of events partitions")
+    await maintain_event_partitions(app.state._db)
+    await events_changed(app.state._db)
+
+
+@app.on_event("startup")
+@repeat_every(seconds=config.SCHEDULER_TICK_SECONDS)
+async def archive_past_events() -> None:
+    await run_scheduled_job(
+        app.state._db, "partition-maintenance", config.PARTITION_MAINTENANCE_INTERVAL_SECONDS, maintain_partitions
+    )
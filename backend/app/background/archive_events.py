@@ -0,0 +1,150 @@
+"""
+Maintain the monthly partitions of the events table: create upcoming months ahead of time and
+detach months past the retention window into the events_archive schema.
+
+Partitions are keyed on start_time, but a multi-day event belongs to the month it ends in as far as
+retention goes, so a partition is only archived once every event in it has ended before the cutoff.
+"""
+
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List
+
+from databases import Database
+
+from app.core.config import EVENTS_PARTITIONS_AHEAD, EVENTS_RETENTION_MONTHS
+from app.core.versions import BUMP_VERSION_QUERY
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME_PATTERN = re.compile(r"^events_(\d{4})_(\d{2})$")
+ARCHIVE_SCHEMA = "events_archive"
+DEFAULT_PARTITION = "events_default"
+
+LIST_PARTITIONS_QUERY = """
+    SELECT child.relname AS name FROM pg_inherits
+    JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+    JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+    WHERE parent.relname = 'events';
+"""
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"events_{month.year:04d}_{month.month:02d}"
+
+
+async def list_monthly_partitions(db: Database) -> List[date]:
+    rows = await db.fetch_all(query=LIST_PARTITIONS_QUERY)
+    months = []
+    for row in rows:
+        match = PARTITION_NAME_PATTERN.match(row["name"])
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def create_partition(db: Database, month: date) -> None:
+    """
+    Attach a partition for `month`. Rows for that month sitting in events_default are moved into it
+    first, since postgres refuses to attach a range the default partition already holds rows for.
+    """
+    name = partition_name(month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    async with db.transaction():
+        await db.execute(query=f"CREATE TABLE {name} (LIKE events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        await db.execute(query=f"""
+            WITH moved AS (
+                DELETE FROM events_default WHERE start_time >= '{lower}' AND start_time < '{upper}' RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """)
+        await db.execute(query=f"ALTER TABLE events ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+    logger.info(f"Created events partition {name}")
+
+
+async def still_running(db: Database, month: date, cutoff: date) -> int:
+    """Events in the month's partition that end (or, without an end, start) on or after cutoff."""
+    return await db.fetch_val(
+        query=f"SELECT count(*) FROM {partition_name(month)} WHERE COALESCE(end_time, start_time) >= :cutoff",
+        values={"cutoff": cutoff},
+    )
+
+
+async def archive_default_rows(db: Database, cutoff: date) -> int:
+    """
+    Moves events in events_default that ended before cutoff into events_archive.events_default.
+    These are events older than any monthly partition, which nothing else would ever archive.
+    """
+    async with db.transaction():
+        await db.execute(
+            query=f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{DEFAULT_PARTITION} "
+                  f"(LIKE events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        moved = await db.fetch_val(
+            query=f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION} WHERE COALESCE(end_time, start_time) < :cutoff RETURNING *
+                ), archived AS (
+                    INSERT INTO {ARCHIVE_SCHEMA}.{DEFAULT_PARTITION} SELECT * FROM moved RETURNING 1
+                )
+                SELECT count(*) FROM archived
+            """,
+            values={"cutoff": cutoff},
+        )
+        if moved:
+            # the events trigger doesn't fire for writes straight to a partition
+            await db.execute(query=BUMP_VERSION_QUERY, values={"name": "events"})
+    if moved:
+        logger.info(f"Archived {moved} events from {DEFAULT_PARTITION} to {ARCHIVE_SCHEMA}.{DEFAULT_PARTITION}")
+    return moved
+
+
+async def archive_partition(db: Database, month: date) -> None:
+    name = partition_name(month)
+    async with db.transaction():
+        await db.execute(query=f"ALTER TABLE events DETACH PARTITION {name}")
+        await db.execute(query=f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}")
+        await db.execute(query=BUMP_VERSION_QUERY, values={"name": "events"})
+    logger.info(f"Archived events partition {name} to {ARCHIVE_SCHEMA}.{name}")
+
+
+async def maintain_event_partitions(
+    db: Database,
+    *,
+    months_ahead: int = EVENTS_PARTITIONS_AHEAD,
+    retention_months: int = EVENTS_RETENTION_MONTHS,
+) -> int:
+    """
+    Keeps partitions for the current month and months_ahead after it, and archives partitions whose
+    whole month ended more than retention_months ago, once none of their events are still running.
+    Returns the number of partitions archived.
+    """
+    today = datetime.now(timezone.utc).date()
+    current_month = today.replace(day=1)
+    existing = set(await list_monthly_partitions(db))
+
+    for offset in range(months_ahead + 1):
+        month = add_months(current_month, offset)
+        if month not in existing:
+            await create_partition(db, month)
+
+    cutoff = add_months(current_month, -retention_months)
+    archived = 0
+    for month in sorted(existing):
+        if month >= cutoff:
+            break
+        running = await still_running(db, month, cutoff)
+        if running:
+            logger.info(f"Keeping events partition {partition_name(month)}, {running} of its events end after {cutoff}")
+            continue
+        await archive_partition(db, month)
+        archived += 1
+
+    await archive_default_rows(db, cutoff)
+    return archived
@@ -0,0 +1,101 @@
+"""
+Incremental readers for event dumps, so ingestion never holds a whole dump in memory.
+
+Dumps are either a JSON array of events (.json, what onepa returns) or one event per line (.ndjson).
+"""
+
+import json
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, TypeVar
+
+CHUNK_SIZE = 64 * 1024
+
+T = TypeVar("T")
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+_number_chars = "0123456789+-.eE"
+
+
+def iter_json_array(f: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """
+    Yields the elements of a top-level JSON array as they are read, holding at most one element
+    and one chunk of text at a time.
+    """
+    buffer = ""
+    eof = False
+    started = False
+
+    def fill() -> bool:
+        nonlocal buffer, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        return not eof
+
+    def skip(chars: str) -> int:
+        """Index of the next significant character, reading ahead as needed."""
+        while True:
+            i = len(buffer) - len(buffer.lstrip(chars))
+            if i < len(buffer) or not fill():
+                return i
+
+    while True:
+        pos = skip(_whitespace)
+        buffer = buffer[pos:]
+        if not buffer:
+            raise ValueError("Unexpected end of JSON array")
+
+        if not started:
+            if buffer[0] != "[":
+                raise ValueError("Expected a JSON array of events")
+            started = True
+            buffer = buffer[1:]
+            pos = skip(_whitespace)
+            if buffer[pos:pos + 1] == "]":
+                return
+            continue
+
+        try:
+            value, end = _decoder.raw_decode(buffer)
+        except ValueError:
+            if fill():
+                continue
+            raise
+        if isinstance(value, (int, float)) and not eof and not buffer[end:].lstrip(_number_chars):
+            # the number may continue in the next chunk
+            fill()
+            continue
+        yield value
+
+        buffer = buffer[end:]
+        pos = skip(_whitespace)
+        separator = buffer[pos:pos + 1]
+        buffer = buffer[pos + 1:]
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Expected ',' or ']' in JSON array, got {separator!r}")
+
+
+def iter_ndjson(f: IO[str]) -> Iterator:
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_events_file(path: str) -> Iterator[dict]:
+    with open(path) as f:
+        if path.endswith(".ndjson"):
+            yield from iter_ndjson(f)
+        else:
+            yield from iter_json_array(f)
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
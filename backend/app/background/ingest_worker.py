@@ -0,0 +1,88 @@
+"""
+Runs onepa ingestion on its own thread, away from the event loop and the threadpool that serves requests.
+Ingestion posts back to this server's API, so it must never occupy anything request handling waits on.
+
+A run stops itself at ONEPA_INGESTION_DEADLINE_SECONDS. If its thread is still stuck a read timeout later,
+the run is given up on and the next one gets a fresh thread, so a hung run can't hold the scheduler's lock.
+"""
+
+import asyncio
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.background.scrape_onepa import load_ingestion_state, update_onepa_events
+from app.core.config import INGEST_READ_TIMEOUT_SECONDS, ONEPA_INGESTION_DEADLINE_SECONDS
+from app.models.ingestion import IngestionRunStats, IngestionStatus
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionWorker:
+    """
+    At most one run at a time. A run requested while another is in progress is skipped.
+    """
+    def __init__(self) -> None:
+        self.executor = self.new_executor()
+        self.running_since: Optional[datetime] = None
+        self.last_run: Optional[IngestionRunStats] = None
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[datetime] = None
+
+    @staticmethod
+    def new_executor() -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="onepa-ingest")
+
+    def load_last_run(self) -> None:
+        runs = load_ingestion_state().runs
+        self.last_run = runs[-1] if runs else None
+
+    async def run(self) -> Optional[IngestionRunStats]:
+        if self.running_since is not None:
+            logger.info(f"Onepa ingestion already running since {self.running_since}, skipping")
+            return None
+
+        self.running_since = datetime.now(timezone.utc)
+        logger.info(f"Running update of onepa events at {self.running_since}")
+        try:
+            stats = await asyncio.wait_for(
+                asyncio.get_event_loop().run_in_executor(self.executor, update_onepa_events),
+                ONEPA_INGESTION_DEADLINE_SECONDS + INGEST_READ_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            self.last_error = f"Onepa ingestion still running {INGEST_READ_TIMEOUT_SECONDS:.0f}s past its deadline"
+            self.last_error_at = datetime.now(timezone.utc)
+            logger.error(f"{self.last_error}, abandoning its thread")
+            self.executor.shutdown(wait=False)
+            self.executor = self.new_executor()
+            return None
+        except Exception:
+            self.last_error = traceback.format_exc()
+            self.last_error_at = datetime.now(timezone.utc)
+            logger.exception("Onepa ingestion failed")
+            return None
+        finally:
+            self.running_since = None
+        self.last_run = stats
+        return stats
+
+    def status(self) -> IngestionStatus:
+        if self.running_since is None:
+            # the last run may have been on another worker, which shares the state file
+            self.load_last_run()
+        return IngestionStatus(
+            running=self.running_since is not None,
+            running_since=self.running_since,
+            last_run=self.last_run,
+            last_error=self.last_error,
+            last_error_at=self.last_error_at,
+        )
+
+    def shutdown(self) -> None:
+        # a run in progress is left to finish on its own, shutdown doesn't wait for it
+        self.executor.shutdown(wait=False)
+
+
+ingestion_worker = IngestionWorker()
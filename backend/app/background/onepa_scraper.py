@@ -0,0 +1,193 @@
+"""
+Concurrent scraper for the onepa event search API.
+
+Pages of every category are fetched over one connection pool, with a cap on requests in flight and on
+requests started per second. Every fetched page is appended to a cursor file, so an interrupted scrape
+resumes from the pages it is missing instead of starting over. An on_page callback sees each page as soon as
+it is in, pages resumed from the cursor first, so a caller can work on events while the scrape goes on.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import aiohttp
+
+from app.core.config import (
+    ONEPA_MAX_CONCURRENT_REQUESTS, ONEPA_MAX_RETRIES, ONEPA_REQUESTS_PER_SECOND, ONEPA_SCRAPE_CURSOR_PATH,
+    ONEPA_SEARCH_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+RESULTS_PER_PAGE = 10
+REQUEST_TIMEOUT_SECONDS = 30
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ScrapeFailed(Exception):
+    pass
+
+
+class PageResult(NamedTuple):
+    category: str
+    page: int
+    total_pages: int
+    results: List[dict]
+
+
+class RateLimiter:
+    """
+    Spaces out request starts to at most `rate` a second, across every task sharing it.
+    """
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ScrapeCursor:
+    """
+    Append-only log of fetched pages, one JSON line each. A truncated last line from a crash is ignored.
+    """
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self.pages: Dict[Tuple[str, int], PageResult] = {}
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    page = PageResult(**json.loads(line))
+                except (ValueError, TypeError):
+                    logger.warning(f"Ignoring unreadable line in scrape cursor {self.path}")
+                    continue
+                self.pages[(page.category, page.page)] = page
+        logger.info(f"Resuming onepa scrape with {len(self.pages)} pages already fetched")
+
+    def done(self, category: str) -> Set[int]:
+        return {page for (page_category, page) in self.pages if page_category == category}
+
+    def total_pages(self, category: str) -> Optional[int]:
+        first = self.pages.get((category, 1))
+        return first.total_pages if first else None
+
+    def record(self, page: PageResult) -> None:
+        self.pages[(page.category, page.page)] = page
+        if self.path is not None:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(page._asdict()) + "\n")
+
+    def clear(self) -> None:
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class OnepaScraper:
+    def __init__(
+        self,
+        *,
+        search_url: str = ONEPA_SEARCH_URL,
+        max_concurrent_requests: int = ONEPA_MAX_CONCURRENT_REQUESTS,
+        requests_per_second: float = ONEPA_REQUESTS_PER_SECOND,
+        max_retries: int = ONEPA_MAX_RETRIES,
+        cursor_path: Optional[str] = ONEPA_SCRAPE_CURSOR_PATH,
+    ) -> None:
+        self.search_url = search_url
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.cursor = ScrapeCursor(cursor_path)
+        self.requests = 0
+        self.retries = 0
+
+    async def fetch_page(self, session: aiohttp.ClientSession, category: str, page: int) -> PageResult:
+        params = {"events": "", "aoi": category, "outlet": "", "timePeriod": "", "sort": "rel", "page": str(page)}
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.wait()
+            self.requests += 1
+            try:
+                async with session.get(self.search_url, params=params) as response:
+                    if response.status not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        data = (await response.json(content_type=None))["data"]
+                        total_pages = max(math.ceil(data["totalResults"] / RESULTS_PER_PAGE), 1)
+                        return PageResult(category, page, total_pages, data["results"])
+                    retry_after = response.headers.get("Retry-After")
+                    error = f"HTTP {response.status}"
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                retry_after, error = None, repr(e)
+
+            if attempt == self.max_retries:
+                raise ScrapeFailed(f"Giving up on {category} page {page} after {attempt + 1} attempts: {error}")
+            # full jitter, unless the server said how long to wait, up to BACKOFF_MAX_SECONDS
+            delay = min(float(retry_after), BACKOFF_MAX_SECONDS) if retry_after and retry_after.isdigit() else \
+                random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            logger.info(f"Retrying {category} page {page} in {delay:.1f}s: {error}")
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def scrape_category(
+        self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, category: str,
+        on_page: Callable[[PageResult], None],
+    ) -> None:
+        async def fetch(page: int) -> PageResult:
+            async with semaphore:
+                result = await self.fetch_page(session, category, page)
+            self.cursor.record(result)
+            on_page(result)
+            return result
+
+        # the first page says how many there are, the rest are fetched concurrently
+        total_pages = self.cursor.total_pages(category)
+        if total_pages is None:
+            total_pages = (await fetch(1)).total_pages
+        done = self.cursor.done(category)
+        remaining = [page for page in range(1, total_pages + 1) if page not in done]
+        logger.info(f"Getting events for category {category}: {total_pages} pages, {len(remaining)} to fetch")
+        await asyncio.gather(*(fetch(page) for page in remaining))
+
+    async def scrape(
+        self, categories: Iterable[str], on_page: Optional[Callable[[PageResult], None]] = None
+    ) -> List[dict]:
+        """
+        Every event across categories, each eventId once. The cursor is cleared once all pages are in.
+        """
+        on_page = on_page or (lambda page: None)
+        for key in sorted(self.cursor.pages):
+            on_page(self.cursor.pages[key])
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrent_requests)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await asyncio.gather(*(
+                self.scrape_category(session, semaphore, category, on_page) for category in categories
+            ))
+
+        events = {}
+        for key in sorted(self.cursor.pages):
+            for event in self.cursor.pages[key].results:
+                events.setdefault(event["eventId"], event)
+        self.cursor.clear()
+        logger.info(
+            f"Scraped {len(events)} onepa events from {len(self.cursor.pages)} pages "
+            f"with {self.requests} requests, {self.retries} retries"
+        )
+        return list(events.values())
@@ -0,0 +1,111 @@
+"""
+Fuzzy matching of OnePA event outlets to community club / residents' committee names.
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from fuzzywuzzy import fuzz
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary numbers, a match needs both scores above these
+RATIO_THRESHOLD = 90
+PARTIAL_RATIO_THRESHOLD = 90
+
+NGRAM_SIZE = 3
+MAX_CANDIDATES = 20
+
+
+def normalise(name: str) -> str:
+    name = name.lower().replace("&amp;", "and").replace("&", "and")
+    name = re.sub(r"[^a-z0-9@ ]", " ", name)
+    return " ".join(name.split())
+
+
+def ngrams(name: str, n: int = NGRAM_SIZE) -> Iterable[str]:
+    padded = f" {name} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class OutletMatcher:
+    """
+    Only names sharing the most character n-grams with an outlet are scored with fuzz, instead of every
+    name. Anything that clears the thresholds shares most of its n-grams with the outlet, so it is always
+    among the candidates. Outlet -> match results are memoised and can be saved to disk between runs.
+    """
+    def __init__(self, names: Iterable[str], memo_path: Optional[str] = None) -> None:
+        self.names: List[str] = list(names)
+        self.normalised = [normalise(name) for name in self.names]
+        self.index: Dict[str, List[int]] = defaultdict(list)
+        for i, name in enumerate(self.normalised):
+            for gram in ngrams(name):
+                self.index[gram].append(i)
+
+        # memoised results are only reused against the same list of names
+        self.fingerprint = hashlib.sha1("\n".join(self.names).encode()).hexdigest()
+        self.memo_path = memo_path
+        self.memo: Dict[str, Optional[str]] = self._load_memo()
+        self._memo_changed = False
+
+    def _load_memo(self) -> Dict[str, Optional[str]]:
+        if self.memo_path is None or not os.path.exists(self.memo_path):
+            return {}
+        try:
+            with open(self.memo_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable outlet match cache {self.memo_path}: {e}")
+            return {}
+        if saved.get("fingerprint") != self.fingerprint:
+            logger.info("Reference names changed since outlet matches were cached, starting afresh")
+            return {}
+        return saved["matches"]
+
+    def save(self) -> None:
+        if self.memo_path is None or not self._memo_changed:
+            return
+        tmp_path = f"{self.memo_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "matches": self.memo}, f)
+        os.replace(tmp_path, self.memo_path)
+        self._memo_changed = False
+
+    def candidates(self, outlet: str, limit: int = MAX_CANDIDATES) -> List[int]:
+        shared = Counter()
+        for gram in ngrams(outlet):
+            shared.update(self.index.get(gram, ()))
+        return [i for i, _ in heapq.nlargest(limit, shared.items(), key=lambda item: item[1])]
+
+    def match(self, outlet: str) -> Optional[str]:
+        """
+        The name that best matches outlet, or None if the match is below the confidence thresholds.
+        """
+        if outlet in self.memo:
+            return self.memo[outlet]
+
+        normalised_outlet = normalise(outlet)
+        scores = []
+        for i in self.candidates(normalised_outlet):
+            ratio = fuzz.ratio(normalised_outlet, self.normalised[i])
+            partial_ratio = fuzz.partial_ratio(normalised_outlet, self.normalised[i])
+            scores.append((ratio, partial_ratio, self.names[i]))
+
+        top_match = None
+        if scores:
+            ratio, partial_ratio, name = max(scores)
+            logger.info(f"Top match for {outlet} is {name} with {ratio}, {partial_ratio} confidence level")
+            if ratio > RATIO_THRESHOLD and partial_ratio > PARTIAL_RATIO_THRESHOLD:
+                top_match = name
+
+        if top_match is None:
+            logger.info(f"Confidence level for {outlet} to match to a CC location too low.")
+        self.memo[outlet] = top_match
+        self._memo_changed = True
+        return top_match
@@ -0,0 +1,75 @@
+"""
+Background jobs that run once across every api worker and replica.
+
+Each worker ticks on its own schedule. A job runs in whichever worker takes its postgres advisory lock
+while the job is due. The lock is session-level, so it goes away with a worker that dies mid-run, and the
+next worker to tick sees the unfinished run and starts it again.
+"""
+
+import logging
+import os
+import socket
+from typing import Awaitable, Callable
+
+from databases import Database
+
+logger = logging.getLogger(__name__)
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+REGISTER_JOB_QUERY = """
+    INSERT INTO scheduled_jobs (name) VALUES (:name) ON CONFLICT (name) DO NOTHING;
+"""
+
+TRY_LOCK_QUERY = """
+    SELECT pg_try_advisory_lock(hashtext('scheduled_jobs'), hashtext(:name));
+"""
+
+UNLOCK_QUERY = """
+    SELECT pg_advisory_unlock(hashtext('scheduled_jobs'), hashtext(:name));
+"""
+
+# due when it never ran, its last run started an interval ago, or its last run never finished
+IS_DUE_QUERY = """
+    SELECT last_started_at IS NULL
+        OR last_started_at <= now() - make_interval(secs => :interval_seconds)
+        OR last_finished_at IS NULL
+        OR last_finished_at < last_started_at
+    FROM scheduled_jobs WHERE name = :name;
+"""
+
+MARK_STARTED_QUERY = """
+    UPDATE scheduled_jobs SET last_started_at = now(), last_owner = :owner WHERE name = :name;
+"""
+
+MARK_FINISHED_QUERY = """
+    UPDATE scheduled_jobs SET last_finished_at = now() WHERE name = :name;
+"""
+
+
+async def run_scheduled_job(
+    db: Database, name: str, interval_seconds: int, job: Callable[[], Awaitable[object]]
+) -> bool:
+    """
+    Runs job if it is due and no other worker holds its lock. Returns whether it ran.
+    """
+    async with db.connection() as connection:
+        await connection.execute(query=REGISTER_JOB_QUERY, values={"name": name})
+        if not await connection.fetch_val(query=TRY_LOCK_QUERY, values={"name": name}):
+            return False
+        try:
+            due = await connection.fetch_val(
+                query=IS_DUE_QUERY, values={"name": name, "interval_seconds": interval_seconds}
+            )
+            if not due:
+                return False
+
+            logger.info(f"Running scheduled job {name} on {OWNER}")
+            await connection.execute(query=MARK_STARTED_QUERY, values={"name": name, "owner": OWNER})
+            try:
+                await job()
+            finally:
+                await connection.execute(query=MARK_FINISHED_QUERY, values={"name": name})
+            return True
+        finally:
+            await connection.execute(query=UNLOCK_QUERY, values={"name": name})
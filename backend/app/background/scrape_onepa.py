@@ -1,16 +1,28 @@
-from datetime import datetime, timedelta
-from fuzzywuzzy import fuzz
+from datetime import datetime, timedelta, timezone
 import json
 import asyncio
 import requests
 import logging
-import csv
+import hashlib
+import os
+import queue
+import threading
+import time
+from functools import lru_cache
 
 from fastapi import Body, Depends
 import pendulum
 
+from app.background.event_stream import batched, iter_events_file
+from app.background.outlet_matcher import OutletMatcher
+from app.core.config import (
+    INGEST_BATCH_SIZE, INGEST_CONNECT_TIMEOUT_SECONDS, INGEST_READ_TIMEOUT_SECONDS, INGESTION_RUNS_KEPT,
+    INGESTION_STATE_PATH, ONEPA_EVENTS_PATH, ONEPA_INGESTION_DEADLINE_SECONDS, ONEPA_LIVE_SCRAPE, OUTLET_MATCHES_PATH,
+)
 from app.db.repositories.events import EventsRepository
 from app.models.events import EventsCreate
+from app.core.reference_data import rc_name_coords
+from app.models.ingestion import IngestionRunStats, IngestionState
 from app.api.dependencies.database import get_repository
 
 CATEGORIES = ["Active Aging",
@@ -33,41 +45,88 @@ CATEGORIES = ["Active Aging",
 
 SG_TIMEZONE = pendulum.timezone("Asia/Singapore")
 
-path_to_csv = "data/rc_name_coords.csv"
-cc_coord_mapping = {}
-with open(path_to_csv, 'r') as csvfile:
-    reader = csv.reader(csvfile, delimiter=',', quotechar='|', quoting=csv.QUOTE_MINIMAL)
-    for entry in reader:
-        name, lat, lng = entry
-        cc_coord_mapping[name] = (lat, lng)
-
-from pprint import pprint
-pprint(cc_coord_mapping)
-
-def scrape_onepa_events():
-    events = []
-    path_to_events = "data/onepa-events.json"
-    events = json.load(open(path_to_events))
-
-    # Let's not spam onepa
-    # for category in CATEGORIES:
-    #     page = 1
-    #     res_per_page = 10
-    #     response = requests.get(f"https://www.onepa.gov.sg/pacesapi/eventsearch/searchjson?events=&aoi={category}&outlet=&timePeriod=&sort=rel&page={page}")
-    #     res = response.json()
-    #     events.extend(res["data"]["results"])
-    #     total_results = res["data"]["totalResults"]
-    #     max_pages = round(total_results / res_per_page)
-    #     logging.info(f"Getting events for category {category}. {total_results} results in {max_pages} pages")
-    #     page += 1
-    #     while page < max_pages:
-    #         response = requests.get(f"https://www.onepa.gov.sg/pacesapi/eventsearch/searchjson?events=&aoi=category&outlet=&timePeriod=&sort=rel&page={page}")
-    #         res = response.json()
-    #         logging.info(f"Getting events for category {category}, page {page}. {response.status_code}")
-    #         events.extend(res["data"]["results"])
-    #         page += 1
-
-    return events
+EVENTS_API = "http://localhost:8000/api/events"
+
+
+class IngestionDeadlineExceeded(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def outlet_matcher():
+    return OutletMatcher(rc_name_coords(), memo_path=OUTLET_MATCHES_PATH)
+
+
+@lru_cache(maxsize=None)
+def events_api_session():
+    return requests.Session()
+
+
+class Deadline:
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise IngestionDeadlineExceeded("Onepa ingestion ran past ONEPA_INGESTION_DEADLINE_SECONDS")
+        return remaining
+
+
+def call_events_api(method, path, deadline, **kwargs):
+    """
+    One call to the events api, which may not outlast the run's deadline.
+    """
+    timeout = (INGEST_CONNECT_TIMEOUT_SECONDS, min(INGEST_READ_TIMEOUT_SECONDS, deadline.remaining()))
+    resp = events_api_session().request(method, f"{EVENTS_API}{path}", timeout=timeout, **kwargs)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def scrape_live_events(deadline):
+    """
+    Events from a live scrape, yielded as their pages come in rather than once the whole scrape is done.
+    The scrape runs its own event loop on another thread and hands pages over through a queue.
+    """
+    # aiohttp is slow to import and only needed here
+    from app.background.onepa_scraper import OnepaScraper
+
+    pages = queue.Queue()
+    finished = object()
+
+    def scrape():
+        try:
+            # pages fetched before the deadline stay in the scrape cursor for the next run
+            asyncio.run(asyncio.wait_for(OnepaScraper().scrape(CATEGORIES, on_page=pages.put), deadline.remaining()))
+            pages.put(finished)
+        except BaseException as e:
+            pages.put(e)
+
+    threading.Thread(target=scrape, name="onepa-scrape", daemon=True).start()
+    seen = set()
+    while True:
+        page = pages.get()
+        if page is finished:
+            return
+        if isinstance(page, (asyncio.TimeoutError, IngestionDeadlineExceeded)):
+            raise IngestionDeadlineExceeded("Onepa scrape ran past ONEPA_INGESTION_DEADLINE_SECONDS")
+        if isinstance(page, BaseException):
+            raise page
+        for event in page.results:
+            # an event listed under several categories comes once
+            if event["eventId"] not in seen:
+                seen.add(event["eventId"])
+                yield event
+
+
+def scrape_onepa_events(deadline):
+    """
+    Events one at a time, from a live scrape or streamed from the ONEPA_EVENTS_PATH dump.
+    """
+    if ONEPA_LIVE_SCRAPE:
+        yield from scrape_live_events(deadline)
+    else:
+        yield from iter_events_file(ONEPA_EVENTS_PATH)
 
 
 def parse_event_times(start_date, session_time):
@@ -90,50 +149,145 @@ def parse_event_times(start_date, session_time):
 
 
 def map_coords(event_outlet):
-    matches = []
-    for cc_or_rc_name in cc_coord_mapping:
-        ratio = fuzz.ratio(event_outlet.lower(), cc_or_rc_name.lower())
-        partial_ratio = fuzz.partial_ratio(event_outlet.lower(), cc_or_rc_name.lower())
-        matches.append((ratio, partial_ratio, cc_or_rc_name))
+    top_match = outlet_matcher().match(event_outlet)
+    if top_match is None:
+        logging.info(f"Skipping event at {event_outlet}, no CC location matched.")
+    return top_match
 
-    ratio, partial_ratio, top_match = sorted(matches, reverse=True)[0]
-    logging.info(f"Top match for {event_outlet} is {top_match} with {ratio}, {partial_ratio} confidence level")
 
-    # Arbitrary numbers
-    if ratio > 90 and partial_ratio > 90:
-        return top_match
+def content_hash(event):
+    return hashlib.sha1(json.dumps(event, sort_keys=True).encode()).hexdigest()
 
-    logging.info(f"Confidence level for {event_outlet} to match to a CC location too low. Skipping this event.")
-    return None
 
+def load_ingestion_state():
+    if not os.path.exists(INGESTION_STATE_PATH):
+        return IngestionState()
+    try:
+        return IngestionState.parse_file(INGESTION_STATE_PATH)
+    except ValueError as e:
+        logging.warning(f"Ignoring unreadable ingestion state {INGESTION_STATE_PATH}: {e}")
+        return IngestionState()
 
-def update_onepa_events(
-    events_repo: EventsRepository = Depends(get_repository(EventsRepository))
-):
-    events = scrape_onepa_events()
-    futures = []
 
+def save_ingestion_state(state):
+    state.runs = state.runs[-INGESTION_RUNS_KEPT:]
+    tmp_path = f"{INGESTION_STATE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(state.json())
+    os.replace(tmp_path, INGESTION_STATE_PATH)
+
+
+class IngestionRun:
+    """
+    Bookkeeping shared by the stages of one ingestion run.
+    """
+    def __init__(self, state, stored_hashes, deadline):
+        self.stats = IngestionRunStats(started_at=datetime.now(timezone.utc))
+        self.deadline = deadline
+        self.state = state
+        self.stored_hashes = stored_hashes
+        self.source_eventids = set()
+        self.skipped = {}
+
+
+def changed_events(events, run):
     for event in events:
+        eventid = int(event["eventId"])
+        run.stats.source_events += 1
+        run.source_eventids.add(eventid)
+        event_hash = content_hash(event)
+        if run.stored_hashes.get(eventid) == event_hash or run.state.skipped.get(eventid) == event_hash:
+            run.stats.unchanged += 1
+            if eventid in run.state.skipped:
+                run.skipped[eventid] = event_hash
+            continue
+        yield eventid, event_hash, event
+
+
+def timed_events(changed, run):
+    for eventid, event_hash, event in changed:
+        try:
+            start_time, end_time = parse_event_times(event["startDate"], event["sessionTime"])
+        except (KeyError, ValueError) as e:
+            logging.warning(f"Could not parse onepa event {eventid}: {e}")
+            run.stats.errors += 1
+            continue
+        yield eventid, event_hash, event, start_time, end_time
+
+
+def located_events(timed, run):
+    for eventid, event_hash, event, start_time, end_time in timed:
         top_match = map_coords(event["outlet"])
         if top_match is None:
+            run.stats.skipped += 1
+            run.skipped[eventid] = event_hash
             continue
 
-        lng, lat = cc_coord_mapping[top_match]
-        start_time, end_time = parse_event_times(event["startDate"], event["sessionTime"])
-        new_event = {
-            "new_events": {
-                "start_time": start_time.timestamp(),
-                "end_time": end_time.timestamp(),
-                "name": event["share"]["title"],
-                "category": "official",
-                "description": event["share"]["description"],
-                "lat": lat,
-                "lng": lng,
-                "address": event["outlet"],
-                "url": event["share"]["url"],
-                "organizer": event["organisingCommitteeName"],
-                "onepa_eventid": event["eventId"],
-            }
+        lng, lat = rc_name_coords()[top_match]
+        yield {
+            "start_time": start_time.timestamp(),
+            "end_time": end_time.timestamp(),
+            "name": event["share"]["title"],
+            "category": "official",
+            "description": event["share"]["description"],
+            "lat": lat,
+            "lng": lng,
+            "address": event["outlet"],
+            "url": event["share"]["url"],
+            "organizer": event["organisingCommitteeName"],
+            "onepa_eventid": event["eventId"],
+            "content_hash": event_hash,
         }
-        # TODO: update
-        resp = requests.post("http://localhost:8000/api/events/", json=new_event)
+
+
+def upsert_batches(new_events, run):
+    for batch in batched(new_events, INGEST_BATCH_SIZE):
+        result = call_events_api("POST", "/bulk", run.deadline, json={"new_events": batch})
+        run.stats.inserted += result["inserted"]
+        run.stats.updated += result["updated"]
+        logging.info(f"Upserted a batch of {len(batch)} onepa events")
+
+
+def update_onepa_events(
+    events_repo: EventsRepository = Depends(get_repository(EventsRepository)),
+    deadline_seconds: float = ONEPA_INGESTION_DEADLINE_SECONDS,
+):
+    """
+    Events stream through parse -> time-parse -> coordinate-match -> batch-upsert, so a batch is sent as
+    soon as it fills. Only events whose content hash differs from the stored one get past the first stage,
+    and events that disappeared from onepa are deleted at the end.
+
+    Raises IngestionDeadlineExceeded at the first call to the events api or scrape past deadline_seconds.
+    Batches upserted until then stay, and the next run skips them by their content hash.
+    """
+    deadline = Deadline(deadline_seconds)
+    state = load_ingestion_state()
+    if state.matcher_fingerprint != outlet_matcher().fingerprint:
+        state.skipped = {}
+        state.matcher_fingerprint = outlet_matcher().fingerprint
+
+    hashes = call_events_api("GET", "/onepa-hashes", deadline)
+    stored_hashes = {int(eventid): event_hash for eventid, event_hash in hashes.items()}
+
+    run = IngestionRun(state, stored_hashes, deadline)
+    stats = run.stats
+    upsert_batches(located_events(timed_events(changed_events(scrape_onepa_events(deadline), run), run), run), run)
+    outlet_matcher().save()
+
+    # stored events no longer on onepa, including ones that stopped matching a community club
+    vanished = sorted(set(stored_hashes) - (run.source_eventids - set(run.skipped)))
+    if vanished:
+        stats.deleted = call_events_api("DELETE", "/onepa", deadline, json={"onepa_eventids": vanished})["deleted"]
+
+    stats.finished_at = datetime.now(timezone.utc)
+    stats.duration_seconds = (stats.finished_at - stats.started_at).total_seconds()
+    state.skipped = run.skipped
+    state.last_checkpoint = stats.started_at
+    state.runs.append(stats)
+    save_ingestion_state(state)
+    logging.info(
+        f"Ingested {stats.source_events} onepa events in {stats.duration_seconds:.1f}s: {stats.unchanged} unchanged, "
+        f"{stats.skipped} skipped, {stats.inserted} inserted, {stats.updated} updated, "
+        f"{stats.deleted} deleted, {stats.errors} errors"
+    )
+    return stats
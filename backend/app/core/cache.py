@@ -0,0 +1,73 @@
+"""
+Bounded in-process cache for serialised API responses.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional
+
+from databases import Database
+
+from app.core.config import EVENTS_CACHE_SIZE
+from app.core.versions import VersionSnapshot, events_version
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """
+    LRU of response bodies keyed by normalised query parameters and the table version they were read at.
+    Entries from an older version are never served, and invalidate() drops them straight away. A version
+    of None means the current one isn't known, and nothing is cached or served for it.
+    Only touched from the event loop, so there's no locking.
+    """
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: Optional[VersionSnapshot]) -> Optional[CachedResponse]:
+        entry = self._entries.get((key, version)) if version is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((key, version))
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, version: Optional[VersionSnapshot], response: CachedResponse) -> None:
+        if version is None:
+            return
+        self._entries[(key, version)] = response
+        self._entries.move_to_end((key, version))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+events_cache = ResponseCache(EVENTS_CACHE_SIZE)
+events_version.subscribe(events_cache.invalidate)
+
+
+async def events_changed(db: Database) -> None:
+    """
+    Call after anything that writes to the events table, so this process serves the write straight away.
+    Other processes hear of it from the table_versions notification.
+    """
+    await events_version.refresh(db)
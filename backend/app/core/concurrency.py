@@ -0,0 +1,118 @@
+"""
+Coalescing and load shedding for database-backed routes.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from fastapi import HTTPException
+from starlette.status import HTTP_503_SERVICE_UNAVAILABLE
+
+from app.core.config import (
+    EVENTS_MAX_CONCURRENT_QUERIES, EVENTS_MAX_CONCURRENT_STREAMS, EVENTS_RETRY_AFTER_SECONDS,
+    NEAREST_EVENTS_MAX_CONCURRENT_QUERIES,
+)
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """Set on a call's future when the caller running it was cancelled, so a follower takes over."""
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution: the first caller runs it and
+    everyone who arrives while it is running awaits the same result (or exception).
+    If the caller running it is cancelled, the first follower to wake runs it again for the rest.
+    """
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.handovers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._calls.get(key)
+        if future is not None:
+            self.followers += 1
+        while future is not None:
+            try:
+                # shielded so a follower going away doesn't cancel the call for everyone else
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                future = self._calls.get(key)
+                if future is None:
+                    self.handovers += 1
+        return await self._lead(key, fn)
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.leaders += 1
+        future = asyncio.get_event_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark it retrieved, there may be no followers to see it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "handovers": self.handovers,
+        }
+
+
+class ConcurrencyLimiter:
+    """
+    Caps how many requests of a route can be working against the database at once.
+    Over the limit, requests are rejected with 503 + Retry-After instead of queueing on the pool.
+    Used as `async with`, or with acquire() and release() for a slot held past the handler, like a stream's.
+    """
+    def __init__(self, limit: int, retry_after: int) -> None:
+        self.limit = limit
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.rejected = 0
+
+    def acquire(self) -> None:
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent queries, try again shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "limit": self.limit, "rejected": self.rejected}
+
+
+events_flights = SingleFlight()
+events_limiter = ConcurrencyLimiter(EVENTS_MAX_CONCURRENT_QUERIES, EVENTS_RETRY_AFTER_SECONDS)
+nearest_events_limiter = ConcurrencyLimiter(NEAREST_EVENTS_MAX_CONCURRENT_QUERIES, EVENTS_RETRY_AFTER_SECONDS)
+events_stream_limiter = ConcurrencyLimiter(EVENTS_MAX_CONCURRENT_STREAMS, EVENTS_RETRY_AFTER_SECONDS)
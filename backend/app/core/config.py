@@ -9,3 +9,55 @@ VERSION = "1.0.0"
 API_PREFIX = "/api"
 
 SQLALCHEMY_DATABASE_URI = config("SQLALCHEMY_DATABASE_URI", cast=str)
+
+# number of serialised GET /api/events responses kept in memory
+EVENTS_CACHE_SIZE = config("EVENTS_CACHE_SIZE", cast=int, default=1024)
+# each api process listens for table version changes, see app.core.versions; caching is off while it can't
+VERSION_LISTENER_HEARTBEAT_SECONDS = config("VERSION_LISTENER_HEARTBEAT_SECONDS", cast=float, default=10)
+VERSION_LISTENER_RETRY_SECONDS = config("VERSION_LISTENER_RETRY_SECONDS", cast=float, default=5)
+
+# database-backed event queries one process runs at once per route, together kept under the pool size in
+# app.db.tasks. a stream holds its connection until the client has read it all
+EVENTS_MAX_CONCURRENT_QUERIES = config("EVENTS_MAX_CONCURRENT_QUERIES", cast=int, default=4)
+NEAREST_EVENTS_MAX_CONCURRENT_QUERIES = config("NEAREST_EVENTS_MAX_CONCURRENT_QUERIES", cast=int, default=2)
+EVENTS_MAX_CONCURRENT_STREAMS = config("EVENTS_MAX_CONCURRENT_STREAMS", cast=int, default=2)
+EVENTS_RETRY_AFTER_SECONDS = config("EVENTS_RETRY_AFTER_SECONDS", cast=int, default=1)
+
+# monthly events partitions created ahead of time, and how many past months stay attached before being archived
+EVENTS_PARTITIONS_AHEAD = config("EVENTS_PARTITIONS_AHEAD", cast=int, default=12)
+EVENTS_RETENTION_MONTHS = config("EVENTS_RETENTION_MONTHS", cast=int, default=3)
+
+# outlet -> community club matches remembered between onepa ingestion runs
+OUTLET_MATCHES_PATH = config("OUTLET_MATCHES_PATH", cast=str, default="data/outlet_matches.json")
+
+# checkpoint and recent run statistics of the incremental onepa ingestion
+INGESTION_STATE_PATH = config("INGESTION_STATE_PATH", cast=str, default="data/onepa_ingestion_state.json")
+INGESTION_RUNS_KEPT = config("INGESTION_RUNS_KEPT", cast=int, default=30)
+
+# live onepa scraping, off by default in favour of the data/onepa-events.json snapshot
+ONEPA_LIVE_SCRAPE = config("ONEPA_LIVE_SCRAPE", cast=bool, default=False)
+ONEPA_SEARCH_URL = config("ONEPA_SEARCH_URL", cast=str, default="https://www.onepa.gov.sg/pacesapi/eventsearch/searchjson")
+ONEPA_MAX_CONCURRENT_REQUESTS = config("ONEPA_MAX_CONCURRENT_REQUESTS", cast=int, default=4)
+ONEPA_REQUESTS_PER_SECOND = config("ONEPA_REQUESTS_PER_SECOND", cast=float, default=2)
+ONEPA_MAX_RETRIES = config("ONEPA_MAX_RETRIES", cast=int, default=4)
+ONEPA_SCRAPE_CURSOR_PATH = config("ONEPA_SCRAPE_CURSOR_PATH", cast=str, default="data/onepa_scrape_cursor.ndjson")
+
+# onepa dump ingested when not scraping live, a JSON array (.json) or one event per line (.ndjson)
+ONEPA_EVENTS_PATH = config("ONEPA_EVENTS_PATH", cast=str, default="data/onepa-events.json")
+# events per bulk upsert request sent while a dump is still being read
+INGEST_BATCH_SIZE = config("INGEST_BATCH_SIZE", cast=int, default=500)
+# ingestion's calls back to the events api, and how long a whole ingestion run may take before it is abandoned
+INGEST_CONNECT_TIMEOUT_SECONDS = config("INGEST_CONNECT_TIMEOUT_SECONDS", cast=float, default=5)
+INGEST_READ_TIMEOUT_SECONDS = config("INGEST_READ_TIMEOUT_SECONDS", cast=float, default=120)
+ONEPA_INGESTION_DEADLINE_SECONDS = config("ONEPA_INGESTION_DEADLINE_SECONDS", cast=float, default=60 * 60)
+
+# every api worker checks this often whether a scheduled job is due, and one of them runs it
+SCHEDULER_TICK_SECONDS = config("SCHEDULER_TICK_SECONDS", cast=int, default=60)
+ONEPA_INGESTION_INTERVAL_SECONDS = config("ONEPA_INGESTION_INTERVAL_SECONDS", cast=int, default=60 * 60 * 24)
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = config("PARTITION_MAINTENANCE_INTERVAL_SECONDS", cast=int, default=60 * 60 * 24)
+
+# community clubs and residents' committees events are assigned to, by nearest
+CC_COORDS_PATH = config("CC_COORDS_PATH", cast=str, default="data/cc_name_coords_link.csv")
+RC_COORDS_PATH = config("RC_COORDS_PATH", cast=str, default="data/rc_name_coords_link.csv")
+# names onepa event outlets are matched against
+RC_NAME_COORDS_PATH = config("RC_NAME_COORDS_PATH", cast=str, default="data/rc_name_coords.csv")
@@ -0,0 +1,60 @@
+"""
+Nearest community club (CC) and residents' committee (RC) of a point, assigned to events as they are stored.
+
+A batch of events is measured against every CC and RC in one numpy pass, which is CPU work, so callers on the
+event loop run assign_kampongs in a threadpool.
+"""
+
+from functools import lru_cache
+from typing import List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from app.core.reference_data import Kampong, community_clubs, residents_committees
+from listener.geo import Points
+
+
+class KampongAssignment(NamedTuple):
+    cc_name: str
+    cc_distance_km: float
+    rc_name: str
+    rc_distance_km: float
+
+
+class KampongIndex:
+    """
+    Kampong coordinates as geo.Points, so nearest() measures every point against every kampong at once.
+    """
+    def __init__(self, kampongs: List[Kampong]) -> None:
+        self.names = [kampong.name for kampong in kampongs]
+        self.points = Points([kampong.lat for kampong in kampongs], [kampong.lng for kampong in kampongs])
+
+    def nearest(self, lats: np.ndarray, lngs: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        distances = Points(lats, lngs).distance_matrix(self.points)
+        nearest = distances.argmin(axis=1)
+        return [self.names[i] for i in nearest], distances[np.arange(len(nearest)), nearest]
+
+
+@lru_cache(maxsize=None)
+def community_club_index() -> KampongIndex:
+    return KampongIndex(community_clubs())
+
+
+@lru_cache(maxsize=None)
+def residents_committee_index() -> KampongIndex:
+    return KampongIndex(residents_committees())
+
+
+def assign_kampongs(points: Sequence[Tuple[float, float]]) -> List[KampongAssignment]:
+    """
+    Nearest CC and RC of each (lat, lng), in order.
+    """
+    if not points:
+        return []
+    lats, lngs = np.array(points, dtype=float).T
+    cc_names, cc_distances = community_club_index().nearest(lats, lngs)
+    rc_names, rc_distances = residents_committee_index().nearest(lats, lngs)
+    return [
+        KampongAssignment(cc_name, round(float(cc_distance), 3), rc_name, round(float(rc_distance), 3))
+        for cc_name, cc_distance, rc_name, rc_distance in zip(cc_names, cc_distances, rc_names, rc_distances)
+    ]
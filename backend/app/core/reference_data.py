@@ -0,0 +1,40 @@
+"""
+Reference data read from data/ on first use and kept for the life of the process,
+so importing the app doesn't touch the disk.
+"""
+
+import csv
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+from app.core.config import CC_COORDS_PATH, RC_COORDS_PATH, RC_NAME_COORDS_PATH
+
+
+class Kampong(NamedTuple):
+    name: str
+    lat: float
+    lng: float
+
+
+def load_kampongs(path: str) -> List[Kampong]:
+    with open(path) as f:
+        return [Kampong(row["name"], float(row["lat"]), float(row["long"])) for row in csv.DictReader(f)]
+
+
+@lru_cache(maxsize=None)
+def community_clubs() -> List[Kampong]:
+    return load_kampongs(CC_COORDS_PATH)
+
+
+@lru_cache(maxsize=None)
+def residents_committees() -> List[Kampong]:
+    return load_kampongs(RC_COORDS_PATH)
+
+
+@lru_cache(maxsize=None)
+def rc_name_coords() -> Dict[str, Tuple[str, str]]:
+    """
+    Outlet names onepa events are matched against -> (long, lat), as written in the csv.
+    """
+    with open(RC_NAME_COORDS_PATH) as f:
+        return {row["name"]: (row["long"], row["lat"]) for row in csv.DictReader(f)}
@@ -0,0 +1,45 @@
+"""
+JSON encoding for event lists that skips per-row pydantic models.
+"""
+
+from typing import Iterable
+
+import orjson
+
+from app.models.events import EventRow
+
+
+def event_row_to_dict(row: EventRow) -> dict:
+    # same keys, in the same order, as EventsPublic
+    return {
+        "start_time": row.start_time,
+        "end_time": row.end_time,
+        "name": row.name,
+        "category": row.category,
+        "description": row.description,
+        "url": row.url,
+        "organizer": row.organizer,
+        "onepa_eventid": row.onepa_eventid,
+        "address": row.address,
+        "lat": row.lat,
+        "lng": row.lng,
+        "distance": row.distance,
+        "cc_name": row.cc_name,
+        "cc_distance_km": row.cc_distance_km,
+        "rc_name": row.rc_name,
+        "rc_distance_km": row.rc_distance_km,
+    }
+
+
+def encode_event_rows(rows: Iterable[EventRow]) -> bytes:
+    """
+    A JSON array of events. orjson writes datetimes as RFC 3339 strings, like jsonable_encoder does.
+    """
+    return orjson.dumps([event_row_to_dict(row) for row in rows])
+
+
+def encode_event_row_line(row: EventRow) -> bytes:
+    """
+    One NDJSON line.
+    """
+    return orjson.dumps(event_row_to_dict(row)) + b"\n"
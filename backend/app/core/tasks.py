@@ -2,18 +2,24 @@
 Define startup/shutdown tasks in app.
 """
 
+import asyncio
 from typing import Callable
 from fastapi import FastAPI
+from app.core.config import SQLALCHEMY_DATABASE_URI
+from app.core.versions import VersionListener, events_version
 from app.db.tasks import connect_to_db, close_db_connection
 
 
 def create_start_app_handler(app: FastAPI) -> Callable:
     async def start_app() -> None:
         await connect_to_db(app)
+        listener = VersionListener(str(SQLALCHEMY_DATABASE_URI), [events_version])
+        app.state._version_listener = asyncio.ensure_future(listener.run())
     return start_app
 
 
 def create_stop_app_handler(app: FastAPI) -> Callable:
     async def stop_app() -> None:
+        app.state._version_listener.cancel()
         await close_db_connection(app)
     return stop_app
@@ -0,0 +1,200 @@
+"""
+Track when a table last changed so unchanged responses can be answered with 304 Not Modified.
+
+Versions live in the table_versions table. Triggers bump a table's version in the same transaction as
+every statement that changes its rows, and notify the table_versions channel. Every api process listens on that channel, so a
+write through any worker or replica moves the version in all of them. A process that isn't listening can't
+tell whether its copy is current, so until it is, it neither answers 304 nor caches.
+"""
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import asyncpg
+from databases import Database
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from app.core.config import VERSION_LISTENER_HEARTBEAT_SECONDS, VERSION_LISTENER_RETRY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_CHANNEL = "table_versions"
+
+GET_VERSIONS_QUERY = """
+    SELECT name, version, last_modified FROM table_versions;
+"""
+
+GET_VERSION_QUERY = """
+    SELECT version, last_modified FROM table_versions WHERE name = :name;
+"""
+
+# for writes the trigger doesn't see, like detaching a partition
+BUMP_VERSION_QUERY = """
+    SELECT bump_table_version(:name);
+"""
+
+
+class VersionSnapshot(NamedTuple):
+    """
+    A table's version as it was when a response started being built, so its validators match its rows.
+    """
+    name: str
+    version: int
+    last_modified: datetime
+
+    def etag(self, key: str = "") -> str:
+        digest = hashlib.sha1(
+            f"{self.name}:{self.version}:{self.last_modified.timestamp()}:{key}".encode()
+        ).hexdigest()[:16]
+        return f'W/"{digest}"'
+
+
+class TableVersion:
+    """
+    This process's copy of a table's version, current while `synced`.
+    """
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.version = 0
+        self.last_modified = datetime.fromtimestamp(0, timezone.utc)
+        self.synced = False
+        self._subscribers: List[Callable[[], None]] = []
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """callback runs whenever the version moves or stops being known."""
+        self._subscribers.append(callback)
+
+    def _changed(self) -> None:
+        for callback in self._subscribers:
+            callback()
+
+    def update(self, version: int, last_modified: datetime, *, resync: bool = False) -> None:
+        # a notification can arrive after a refresh already saw the same write
+        if not resync and version <= self.version:
+            return
+        self.version = version
+        # HTTP dates only have second precision
+        self.last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+        self._changed()
+
+    def desync(self) -> None:
+        if self.synced:
+            self.synced = False
+            self._changed()
+
+    def snapshot(self) -> Optional[VersionSnapshot]:
+        """The version to cache and validate against, or None if neither is safe right now."""
+        if not self.synced:
+            return None
+        return VersionSnapshot(self.name, self.version, self.last_modified)
+
+    async def refresh(self, db: Database) -> None:
+        """
+        Reads the version straight away, so a process sees its own writes before their notification arrives.
+        """
+        if not self.synced:
+            return
+        row = await db.fetch_one(query=GET_VERSION_QUERY, values={"name": self.name})
+        if row is not None:
+            self.update(row["version"], row["last_modified"])
+
+
+events_version = TableVersion("events")
+
+
+class VersionListener:
+    """
+    Keeps TableVersions in step with table_versions over a dedicated connection, reconnecting when it drops.
+    """
+    def __init__(self, database_url: str, versions: List[TableVersion]) -> None:
+        self.database_url = database_url
+        self.versions: Dict[str, TableVersion] = {version.name: version for version in versions}
+
+    def _notified(self, connection, pid: int, channel: str, payload: str) -> None:
+        name, version, epoch = payload.split(":")
+        if name in self.versions:
+            self.versions[name].update(int(version), datetime.fromtimestamp(float(epoch), timezone.utc))
+
+    async def _listen(self) -> None:
+        connection = await asyncpg.connect(self.database_url, timeout=VERSION_LISTENER_HEARTBEAT_SECONDS)
+        try:
+            await connection.add_listener(VERSIONS_CHANNEL, self._notified)
+            # read after listening, so a write in between is still seen
+            for row in await connection.fetch(GET_VERSIONS_QUERY):
+                version = self.versions.get(row["name"])
+                if version is not None:
+                    version.update(row["version"], row["last_modified"], resync=True)
+                    version.synced = True
+            logger.info(f"Listening for changes to {', '.join(sorted(self.versions))}")
+            # notifications don't tell us the connection died, a query that doesn't come back does
+            while True:
+                await asyncio.sleep(VERSION_LISTENER_HEARTBEAT_SECONDS)
+                await asyncio.wait_for(connection.fetchval("SELECT 1"), VERSION_LISTENER_HEARTBEAT_SECONDS)
+        finally:
+            for version in self.versions.values():
+                version.desync()
+            connection.terminate()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"Not listening for table version changes, caching is off until reconnected "
+                    f"in {VERSION_LISTENER_RETRY_SECONDS}s: {e!r}"
+                )
+            await asyncio.sleep(VERSION_LISTENER_RETRY_SECONDS)
+
+
+def request_key(request: Request, extra: str = "") -> str:
+    """
+    Normalised query string and response format, so equivalent requests share an ETag.
+    `extra` is for anything else the response depends on, e.g. the current time for "next 7 days" queries.
+    """
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{params}|{request.headers.get('accept', '')}|{extra}"
+
+
+def not_modified(request: Request, version: Optional[VersionSnapshot], extra: str = "") -> Optional[Response]:
+    """
+    A 304 response if the client's copy is still current, otherwise None.
+    """
+    if version is None:
+        return None
+    etag = version.etag(request_key(request, extra))
+    headers = {"ETag": etag, "Last-Modified": format_datetime(version.last_modified, usegmt=True)}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        client_etags = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in client_etags or "*" in client_etags:
+            return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and not extra:
+        try:
+            if version.last_modified <= parsedate_to_datetime(if_modified_since):
+                return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def set_validators(
+    request: Request, response: Response, version: Optional[VersionSnapshot], extra: str = ""
+) -> None:
+    response.headers["Cache-Control"] = "no-cache"
+    if version is None:
+        return
+    response.headers["ETag"] = version.etag(request_key(request, extra))
+    response.headers["Last-Modified"] = format_datetime(version.last_modified, usegmt=True)
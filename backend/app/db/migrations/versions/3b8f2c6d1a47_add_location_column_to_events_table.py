@@ -0,0 +1,30 @@
+"""add location column to events table
+Revision ID: 3b8f2c6d1a47
+Revises: 01e42381f7ff
+Create Date: 2022-03-05 10:12:44.118302
+"""
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geography
+
+
+# revision identifiers, used by Alembic
+revision = '3b8f2c6d1a47'
+down_revision = '01e42381f7ff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    op.add_column(
+        "events",
+        sa.Column("location", Geography(geometry_type="POINT", srid=4326, spatial_index=False))
+    )
+    op.execute("UPDATE events SET location = ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography")
+    op.create_index("ix_events_location", "events", ["location"], postgresql_using="gist")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_location", table_name="events")
+    op.drop_column("events", "location")
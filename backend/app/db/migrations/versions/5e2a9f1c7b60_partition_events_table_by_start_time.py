@@ -0,0 +1,124 @@
+"""partition events table by start_time
+Revision ID: 5e2a9f1c7b60
+Revises: 9c41d7e0b3f2
+Create Date: 2022-03-12 16:05:37.824410
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '5e2a9f1c7b60'
+down_revision = '9c41d7e0b3f2'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger(f"alembic.{__name__}")
+
+COLUMNS = "id, onepa_eventid, start_time, end_time, name, category, description, lat, lng, url, organizer, address, location"
+
+# one partition per month from the earliest event to a year ahead, named events_YYYY_MM;
+# app.background.archive_events keeps the window moving after this
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', LEAST(COALESCE((SELECT min(start_time) FROM events), now()), now())),
+            date_trunc('month', now()) + interval '12 months',
+            interval '1 month'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF events_partitioned FOR VALUES FROM (%L) TO (%L)',
+            'events_' || to_char(month, 'YYYY_MM'), month, (month + interval '1 month')::date
+        );
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade() -> None:
+    # unique constraints on a partitioned table have to include the partition key,
+    # so onepa events are now unique on (onepa_eventid, start_time)
+    op.execute("""
+        CREATE TABLE events_partitioned (
+            id serial NOT NULL,
+            onepa_eventid integer,
+            start_time timestamp with time zone NOT NULL,
+            end_time timestamp with time zone,
+            name text,
+            category text,
+            description text,
+            lat double precision,
+            lng double precision,
+            url text,
+            organizer text,
+            address text,
+            location geography(Point, 4326),
+            PRIMARY KEY (id, start_time),
+            CONSTRAINT events_onepa_eventid_start_time_key UNIQUE (onepa_eventid, start_time)
+        ) PARTITION BY RANGE (start_time)
+    """)
+    op.execute("CREATE TABLE events_default PARTITION OF events_partitioned DEFAULT")
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+    op.execute(f"INSERT INTO events_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM events WHERE start_time IS NOT NULL")
+
+    # detached partitions past the retention window are moved here
+    op.execute("CREATE SCHEMA IF NOT EXISTS events_archive")
+
+    # the partition key can't be null, so events without a start time are kept aside rather than dropped
+    without_start_time = op.get_bind().execute(sa.text("SELECT count(*) FROM events WHERE start_time IS NULL")).scalar()
+    if without_start_time:
+        op.execute("CREATE TABLE events_archive.events_without_start_time AS SELECT * FROM events WHERE start_time IS NULL")
+        logger.warning(
+            f"{without_start_time} events have no start_time and can't be partitioned. "
+            f"They were moved to events_archive.events_without_start_time and are no longer served."
+        )
+
+    op.drop_table("events")
+    op.execute("ALTER TABLE events_partitioned RENAME TO events")
+    op.execute("ALTER SEQUENCE events_partitioned_id_seq RENAME TO events_id_seq")
+    op.execute("SELECT setval('events_id_seq', COALESCE((SELECT max(id) FROM events), 0) + 1, false)")
+    op.create_index("ix_events_start_time_id", "events", ["start_time", "id"])
+    op.create_index("ix_events_location", "events", ["location"], postgresql_using="gist")
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE TABLE events_unpartitioned (
+            id serial PRIMARY KEY,
+            onepa_eventid integer UNIQUE,
+            start_time timestamp with time zone,
+            end_time timestamp with time zone,
+            name text,
+            category text,
+            description text,
+            lat double precision,
+            lng double precision,
+            url text,
+            organizer text,
+            address text,
+            location geography(Point, 4326)
+        )
+    """)
+    # an onepa event that was rescheduled across partitions keeps its latest start time
+    op.execute(f"""
+        INSERT INTO events_unpartitioned ({COLUMNS})
+        SELECT DISTINCT ON (COALESCE(onepa_eventid, -id)) {COLUMNS} FROM events
+        ORDER BY COALESCE(onepa_eventid, -id), start_time DESC
+    """)
+    op.execute("DROP TABLE events CASCADE")
+    op.execute("ALTER TABLE events_unpartitioned RENAME TO events")
+    op.execute("ALTER SEQUENCE events_unpartitioned_id_seq RENAME TO events_id_seq")
+    op.execute("SELECT setval('events_id_seq', COALESCE((SELECT max(id) FROM events), 0) + 1, false)")
+    op.execute("ALTER TABLE events RENAME CONSTRAINT events_unpartitioned_pkey TO events_pkey")
+    op.execute("ALTER TABLE events RENAME CONSTRAINT events_unpartitioned_onepa_eventid_key TO events_onepa_eventid_key")
+    op.create_index("ix_events_start_time", "events", ["start_time"])
+    op.create_index("ix_events_start_time_id", "events", ["start_time", "id"])
+    op.create_index("ix_events_location", "events", ["location"], postgresql_using="gist")
+    # archived partitions are left in the events_archive schema
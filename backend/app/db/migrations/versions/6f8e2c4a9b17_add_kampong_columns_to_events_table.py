@@ -0,0 +1,70 @@
+"""add kampong columns to events table
+Revision ID: 6f8e2c4a9b17
+Revises: d4b1f6a2e8c3
+Create Date: 2022-03-14 09:12:55.640381
+"""
+import csv
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import CC_COORDS_PATH, RC_COORDS_PATH
+
+
+# revision identifiers, used by Alembic
+revision = '6f8e2c4a9b17'
+down_revision = 'd4b1f6a2e8c3'
+branch_labels = None
+depends_on = None
+
+kampong_points = sa.table(
+    "kampong_points", sa.column("kind", sa.Text), sa.column("name", sa.Text),
+    sa.column("lat", sa.Float), sa.column("lng", sa.Float),
+)
+
+# nearest kampong of the given kind by haversine distance, as app.core.kampongs measured it when this was written
+NEAREST_KAMPONG = """
+    SELECT name, round((2 * 6371.0088 * asin(sqrt(a)))::numeric, 3)::float FROM (
+        SELECT name, sin(radians(kampong_points.lat - events.lat) / 2) ^ 2
+            + cos(radians(events.lat)) * cos(radians(kampong_points.lat))
+            * sin(radians(kampong_points.lng - events.lng) / 2) ^ 2 AS a
+        FROM kampong_points WHERE kind = '{kind}'
+    ) AS kampong
+    ORDER BY a LIMIT 1
+"""
+
+
+def read_kampongs(kind, path):
+    with open(path) as f:
+        return [
+            {"kind": kind, "name": row["name"], "lat": float(row["lat"]), "lng": float(row["long"])}
+            for row in csv.DictReader(f)
+        ]
+
+
+def upgrade() -> None:
+    # nearest community club and residents' committee of each event, set by the events repository
+    op.add_column("events", sa.Column("cc_name", sa.Text, nullable=True))
+    op.add_column("events", sa.Column("cc_distance_km", sa.Float, nullable=True))
+    op.add_column("events", sa.Column("rc_name", sa.Text, nullable=True))
+    op.add_column("events", sa.Column("rc_distance_km", sa.Float, nullable=True))
+    op.create_index("ix_events_cc_name_start_time_id", "events", ["cc_name", "start_time", "id"])
+    op.create_index("ix_events_rc_name_start_time_id", "events", ["rc_name", "start_time", "id"])
+
+    op.execute("CREATE TEMPORARY TABLE kampong_points (kind text, name text, lat float, lng float) ON COMMIT DROP")
+    op.bulk_insert(kampong_points, read_kampongs("cc", CC_COORDS_PATH) + read_kampongs("rc", RC_COORDS_PATH))
+    op.execute(f"""
+        UPDATE events SET
+            (cc_name, cc_distance_km) = ({NEAREST_KAMPONG.format(kind="cc")}),
+            (rc_name, rc_distance_km) = ({NEAREST_KAMPONG.format(kind="rc")})
+        WHERE lat IS NOT NULL AND lng IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_rc_name_start_time_id", table_name="events")
+    op.drop_index("ix_events_cc_name_start_time_id", table_name="events")
+    op.drop_column("events", "rc_distance_km")
+    op.drop_column("events", "cc_distance_km")
+    op.drop_column("events", "rc_name")
+    op.drop_column("events", "cc_name")
@@ -0,0 +1,23 @@
+"""add start_time id index to events table
+Revision ID: 9c41d7e0b3f2
+Revises: 3b8f2c6d1a47
+Create Date: 2022-03-06 14:40:21.503118
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '9c41d7e0b3f2'
+down_revision = '3b8f2c6d1a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # keyset pagination seeks on (start_time, id)
+    op.create_index("ix_events_start_time_id", "events", ["start_time", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_start_time_id", table_name="events")
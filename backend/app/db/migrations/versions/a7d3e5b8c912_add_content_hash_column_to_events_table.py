@@ -0,0 +1,23 @@
+"""add content_hash column to events table
+Revision ID: a7d3e5b8c912
+Revises: 5e2a9f1c7b60
+Create Date: 2022-03-13 10:21:48.503117
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = 'a7d3e5b8c912'
+down_revision = '5e2a9f1c7b60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # hash of the onepa source record an event was ingested from, null for everything else
+    op.add_column("events", sa.Column("content_hash", sa.Text, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("events", "content_hash")
@@ -0,0 +1,29 @@
+"""create scheduled_jobs table
+Revision ID: d4b1f6a2e8c3
+Revises: a7d3e5b8c912
+Create Date: 2022-03-13 15:42:09.118236
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = 'd4b1f6a2e8c3'
+down_revision = 'a7d3e5b8c912'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # last run of each background job, shared by every api worker; see app.background.scheduler
+    op.create_table(
+        "scheduled_jobs",
+        sa.Column("name", sa.Text, primary_key=True),
+        sa.Column("last_started_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("last_finished_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("last_owner", sa.Text, nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("scheduled_jobs")
@@ -0,0 +1,91 @@
+"""create table_versions table
+Revision ID: e8a1c3f5b7d9
+Revises: 6f8e2c4a9b17
+Create Date: 2022-03-14 17:20:41.903512
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = 'e8a1c3f5b7d9'
+down_revision = '6f8e2c4a9b17'
+branch_labels = None
+depends_on = None
+
+# bumps a table's version and tells every api process listening on table_versions, see app.core.versions.
+# the notification is only delivered once the writing transaction commits, and not at all if it rolls back
+CREATE_BUMP_FUNCTION = """
+    CREATE FUNCTION bump_table_version(table_name text) RETURNS bigint AS $$
+    DECLARE
+        new_version bigint;
+        modified_at timestamptz;
+    BEGIN
+        UPDATE table_versions SET version = version + 1, last_modified = now()
+        WHERE name = table_name RETURNING version, last_modified INTO new_version, modified_at;
+        PERFORM pg_notify('table_versions', table_name || ':' || new_version || ':' || extract(epoch FROM modified_at));
+        RETURN new_version;
+    END
+    $$ LANGUAGE plpgsql;
+"""
+
+# changed_rows is the statement's transition table, so statements that touch no rows, like an upsert of
+# unchanged events or a delete of ids that aren't there, leave the version and every process's cache alone
+CREATE_TRIGGER_FUNCTION = """
+    CREATE FUNCTION bump_table_version_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM changed_rows) THEN
+            PERFORM bump_table_version(TG_TABLE_NAME);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+"""
+
+# TRUNCATE has no transition table, and is taken as a change
+CREATE_TRUNCATE_TRIGGER_FUNCTION = """
+    CREATE FUNCTION bump_table_version_truncate_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM bump_table_version(TG_TABLE_NAME);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+"""
+
+# postgres only allows a transition table on a trigger for a single event
+EVENTS_TRIGGERS = {
+    "events_version_insert": "AFTER INSERT ON events REFERENCING NEW TABLE AS changed_rows",
+    "events_version_update": "AFTER UPDATE ON events REFERENCING NEW TABLE AS changed_rows",
+    "events_version_delete": "AFTER DELETE ON events REFERENCING OLD TABLE AS changed_rows",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "table_versions",
+        sa.Column("name", sa.Text, primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("last_modified", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.execute("INSERT INTO table_versions (name) VALUES ('events')")
+    op.execute(CREATE_BUMP_FUNCTION)
+    op.execute(CREATE_TRIGGER_FUNCTION)
+    op.execute(CREATE_TRUNCATE_TRIGGER_FUNCTION)
+    # once per statement, so a bulk upsert is at most one bump. partitions detached by maintenance don't fire
+    # these, app.background.archive_events bumps the version itself
+    for name, timing in EVENTS_TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {name} {timing} FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version_trigger()")
+    op.execute("""
+        CREATE TRIGGER events_version_truncate AFTER TRUNCATE ON events
+        FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version_truncate_trigger()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER events_version_truncate ON events")
+    for name in EVENTS_TRIGGERS:
+        op.execute(f"DROP TRIGGER {name} ON events")
+    op.execute("DROP FUNCTION bump_table_version_truncate_trigger()")
+    op.execute("DROP FUNCTION bump_table_version_trigger()")
+    op.execute("DROP FUNCTION bump_table_version(text)")
+    op.drop_table("table_versions")
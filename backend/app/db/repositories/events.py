@@ -1,31 +1,281 @@
-from typing import List
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.core.kampongs import KampongAssignment, assign_kampongs
 from app.db.repositories.base import BaseRepository
-from app.models.events import EventsCreate, EventsUpdate, EventsInDB
+from app.models.events import (
+    CategoryType, EventRow, EventsBulkDeleteResult, EventsBulkUpsertResult, EventsCreate, EventsFilter, EventsUpdate, EventsInDB,
+)
 
 
 CREATE_EVENTS_QUERY = """
-    INSERT INTO events (start_time, end_time, name, category, description, lat, lng, address, url, organizer, onepa_eventid)
-    VALUES (:start_time, :end_time, :name, :category, :description, :lat, :lng, :address, :url, :organizer, :onepa_eventid)
-    RETURNING start_time, end_time, name, category, description, lat, lng, address, url, organizer, onepa_eventid;
+    INSERT INTO events (start_time, end_time, name, category, description, lat, lng, location, address, url, organizer, onepa_eventid, content_hash,
+                        cc_name, cc_distance_km, rc_name, rc_distance_km)
+    VALUES (:start_time, :end_time, :name, :category, :description, :lat, :lng,
+            ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography, :address, :url, :organizer, :onepa_eventid, :content_hash,
+            :cc_name, :cc_distance_km, :rc_name, :rc_distance_km)
+    RETURNING id, start_time, end_time, name, category, description, lat, lng, address, url, organizer, onepa_eventid,
+              cc_name, cc_distance_km, rc_name, rc_distance_km;
 """
 
-SELECT_EVENTS_QUERY = """
-    SELECT * FROM events;
+UPSERT_COLUMNS = [
+    "start_time", "end_time", "name", "category", "description", "lat", "lng", "address", "url", "organizer",
+    "content_hash", "cc_name", "cc_distance_km", "rc_name", "rc_distance_km",
+]
+
+UPSERT_EVENTS_QUERY = """
+    INSERT INTO events (start_time, end_time, name, category, description, lat, lng, location, address, url, organizer, onepa_eventid, content_hash,
+                        cc_name, cc_distance_km, rc_name, rc_distance_km)
+    VALUES {rows}
+    ON CONFLICT (onepa_eventid, start_time) DO UPDATE SET
+        {assignments}, location = EXCLUDED.location
+    WHERE ({current}) IS DISTINCT FROM ({excluded})
+    RETURNING (xmax = 0) AS inserted;
+""".format(
+    rows="{rows}",
+    assignments=", ".join(f"{c} = EXCLUDED.{c}" for c in UPSERT_COLUMNS),
+    current=", ".join(f"events.{c}" for c in UPSERT_COLUMNS),
+    excluded=", ".join(f"EXCLUDED.{c}" for c in UPSERT_COLUMNS),
+)
+
+UPSERT_ROW = """(
+    :start_time_{i}, :end_time_{i}, :name_{i}, :category_{i}, :description_{i}, :lat_{i}, :lng_{i},
+    ST_SetSRID(ST_MakePoint(:lng_{i}, :lat_{i}), 4326)::geography, :address_{i}, :url_{i}, :organizer_{i}, :onepa_eventid_{i},
+    :content_hash_{i}, :cc_name_{i}, :cc_distance_km_{i}, :rc_name_{i}, :rc_distance_km_{i}
+)"""
+
+# events are unique on (onepa_eventid, start_time) because the table is partitioned by start_time,
+# so a rescheduled onepa event has its old row removed before the new one is upserted
+DELETE_RESCHEDULED_EVENTS_QUERY = """
+    DELETE FROM events USING (VALUES {keys}) AS incoming(onepa_eventid, start_time)
+    WHERE events.onepa_eventid = incoming.onepa_eventid AND events.start_time <> incoming.start_time
+    RETURNING events.onepa_eventid;
+"""
+
+RESCHEDULED_KEY = "(CAST(:onepa_eventid_{i} AS integer), CAST(:start_time_{i} AS timestamptz))"
+
+# 17 parameters a row keeps a batch well under the 32767 bind parameters postgres allows
+UPSERT_BATCH_SIZE = 500
+
+SELECT_ONEPA_HASHES_QUERY = """
+    SELECT onepa_eventid, content_hash FROM events WHERE onepa_eventid IS NOT NULL;
+"""
+
+DELETE_ONEPA_EVENTS_QUERY = """
+    DELETE FROM events WHERE onepa_eventid = ANY(CAST(:onepa_eventids AS integer[])) RETURNING id;
 """
 
+EVENTS_COLUMNS = (
+    "id, start_time, end_time, name, category, description, lat, lng, address, url, organizer, onepa_eventid, "
+    "cc_name, cc_distance_km, rc_name, rc_distance_km"
+)
+
+SEARCH_POINT = "ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography"
+
+# <-> on geography is answered by the GiST index on events.location, so each
+# category only reads its k nearest rows instead of scoring the whole table
+NEAREST_EVENTS_QUERY = f"""
+    SELECT nearest.* FROM unnest(CAST(:categories AS text[])) AS c(category)
+    CROSS JOIN LATERAL (
+        SELECT {EVENTS_COLUMNS}, ST_Distance(location, {SEARCH_POINT}) / 1000 AS distance
+        FROM events
+        WHERE events.category = c.category {{time_filter}}
+        ORDER BY location <-> {SEARCH_POINT}
+        LIMIT :k
+    ) AS nearest
+    ORDER BY nearest.category, nearest.distance;
+"""
+
+UPCOMING_FILTER = "AND start_time >= now() AND start_time < now() + make_interval(days => :within_days)"
+
+SEARCH_DISTANCE = f"ST_Distance(location, {SEARCH_POINT}) / 1000"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(event: EventRow, *, is_geo_query: bool) -> str:
+    """
+    Opaque keyset token for the page after `event`: (distance, id) for geo queries, (start_time, id) otherwise.
+    """
+    key = [event.distance if is_geo_query else event.start_time.isoformat(), event.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str, *, is_geo_query: bool) -> Tuple:
+    try:
+        sort_key, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if is_geo_query:
+            return float(sort_key), int(event_id)
+        return datetime.fromisoformat(sort_key), int(event_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor {cursor}") from e
+
+
+def build_events_query(
+    filters: EventsFilter, *, limit: Optional[int] = None, after: Optional[Tuple] = None,
+) -> Tuple[str, dict]:
+    """
+    Events filtered by time window, category, kampong and distance from (lat, lng).
+    Geo queries come back nearest first with `distance` in km, everything else by start time.
+    `after` is a decoded cursor; pages seek past it on the sort key instead of using OFFSET.
+    """
+    columns = [EVENTS_COLUMNS]
+    conditions = []
+    values = {}
+    sort_key = "start_time"
+
+    if filters.is_geo_query:
+        values.update(lat=filters.lat, lng=filters.lng)
+        columns.append(f"{SEARCH_DISTANCE} AS distance")
+        sort_key = SEARCH_DISTANCE
+        if filters.radius_km is not None:
+            # ST_DWithin on geography is answered from the GiST index on events.location
+            conditions.append(f"ST_DWithin(location, {SEARCH_POINT}, CAST(:radius_km AS double precision) * 1000)")
+            values["radius_km"] = filters.radius_km
+    if filters.start is not None:
+        conditions.append("start_time >= :start")
+        values["start"] = filters.start
+    if filters.end is not None:
+        conditions.append("start_time <= :end")
+        values["end"] = filters.end
+    if filters.category is not None:
+        conditions.append("category = :category")
+        values["category"] = filters.category.value
+    if filters.kampong is not None:
+        # each side is answered by its (name, start_time, id) index
+        conditions.append("(cc_name = :kampong OR rc_name = :kampong)")
+        values["kampong"] = filters.kampong
+    if after is not None:
+        conditions.append(f"({sort_key}, id) > (:after_key, :after_id)")
+        values["after_key"], values["after_id"] = after
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT {', '.join(columns)} FROM events {where} ORDER BY {sort_key}, id"
+    if limit is not None:
+        query += " LIMIT :limit"
+        values["limit"] = limit
+    return query, values
+
+
+def event_values(event: EventsCreate, kampongs: KampongAssignment) -> dict:
+    """
+    Column values of a new event, including the kampongs nearest to it.
+    """
+    values = event.dict()
+    values.update(kampongs._asdict())
+    return values
+
+
+async def nearest_kampongs(events: List[EventsCreate]) -> List[KampongAssignment]:
+    # numpy work, kept off the event loop
+    return await run_in_threadpool(assign_kampongs, [(event.lat, event.lng) for event in events])
+
+
 class EventsRepository(BaseRepository):
     """"
     All database actions associated with the Events resource
     """
     async def create_events(self, *, new_events: EventsCreate) -> EventsInDB:
-        query_values = new_events.dict()
+        kampongs, = await nearest_kampongs([new_events])
+        query_values = event_values(new_events, kampongs)
         events = await self.db.fetch_one(query=CREATE_EVENTS_QUERY, values=query_values)
         return EventsInDB(**events)
 
-    async def get_events(self) -> List[EventsInDB]:
-        events = await self.db.fetch_all(query=SELECT_EVENTS_QUERY)
-        return map(lambda e: EventsInDB(**dict(e)), events)
+    async def upsert_events(self, *, new_events: List[EventsCreate]) -> EventsBulkUpsertResult:
+        """
+        Insert or update events keyed on onepa_eventid in one transaction. Rows whose
+        columns already match are left alone and counted as unchanged.
+        """
+        # a batch can't touch the same row twice, so the last copy of a repeated onepa_eventid wins
+        deduplicated = {}
+        for i, event in enumerate(new_events):
+            key = event.onepa_eventid if event.onepa_eventid is not None else f"new-{i}"
+            deduplicated[key] = event
+        events = list(deduplicated.values())
+        kampongs = await nearest_kampongs(events)
+
+        inserted = updated = 0
+        async with self.db.transaction():
+            for batch_start in range(0, len(events), UPSERT_BATCH_SIZE):
+                batch = events[batch_start:batch_start + UPSERT_BATCH_SIZE]
+                batch_kampongs = kampongs[batch_start:batch_start + UPSERT_BATCH_SIZE]
+                values = {}
+                for i, (event, event_kampongs) in enumerate(zip(batch, batch_kampongs)):
+                    values.update({f"{k}_{i}": v for k, v in event_values(event, event_kampongs).items()})
+                rescheduled = await self._delete_rescheduled_events(batch, values)
+                rows = ", ".join(UPSERT_ROW.format(i=i) for i in range(len(batch)))
+                written = await self.db.fetch_all(query=UPSERT_EVENTS_QUERY.format(rows=rows), values=values)
+                batch_inserted = sum(1 for row in written if row["inserted"])
+                # a rescheduled event comes back as an insert but is an update of an existing event
+                inserted += batch_inserted - rescheduled
+                updated += len(written) - batch_inserted + rescheduled
+
+        return EventsBulkUpsertResult(inserted=inserted, updated=updated, unchanged=len(events) - inserted - updated)
+
+    async def _delete_rescheduled_events(self, batch: List[EventsCreate], batch_values: dict) -> int:
+        indices = [i for i, event in enumerate(batch) if event.onepa_eventid is not None]
+        if not indices:
+            return 0
+        keys = ", ".join(RESCHEDULED_KEY.format(i=i) for i in indices)
+        values = {}
+        for i in indices:
+            values[f"onepa_eventid_{i}"] = batch_values[f"onepa_eventid_{i}"]
+            values[f"start_time_{i}"] = batch_values[f"start_time_{i}"]
+        deleted = await self.db.fetch_all(query=DELETE_RESCHEDULED_EVENTS_QUERY.format(keys=keys), values=values)
+        return len({row["onepa_eventid"] for row in deleted})
+
+    async def get_events(
+        self, *, filters: EventsFilter, limit: Optional[int] = None, after: Optional[Tuple] = None,
+    ) -> List[EventRow]:
+        query, values = build_events_query(filters, limit=limit, after=after)
+        events = await self.db.fetch_all(query=query, values=values)
+        return [EventRow.from_record(e) for e in events]
+
+    async def iterate_events(
+        self, *, filters: EventsFilter, limit: Optional[int] = None, after: Optional[Tuple] = None,
+    ) -> AsyncIterator[EventRow]:
+        """
+        Same rows as get_events, read through a server-side cursor instead of being fetched all at once.
+        """
+        query, values = build_events_query(filters, limit=limit, after=after)
+        async for event in self.db.iterate(query=query, values=values):
+            yield EventRow.from_record(event)
+
+    async def get_nearest_events(
+        self,
+        *,
+        lat: float,
+        lng: float,
+        k: int,
+        category: Optional[CategoryType] = None,
+        within_days: Optional[int] = None,
+    ) -> List[EventRow]:
+        """
+        The k nearest events to (lat, lng) for each category, optionally only those starting in the next within_days.
+        """
+        categories = [category] if category is not None else list(CategoryType)
+        values = {"lat": lat, "lng": lng, "k": k, "categories": [c.value for c in categories]}
+        time_filter = ""
+        if within_days is not None:
+            time_filter = UPCOMING_FILTER
+            values["within_days"] = within_days
+
+        query = NEAREST_EVENTS_QUERY.format(time_filter=time_filter)
+        events = await self.db.fetch_all(query=query, values=values)
+        return [EventRow.from_record(e) for e in events]
+
+    async def get_onepa_hashes(self) -> Dict[int, Optional[str]]:
+        rows = await self.db.fetch_all(query=SELECT_ONEPA_HASHES_QUERY)
+        return {row["onepa_eventid"]: row["content_hash"] for row in rows}
+
+    async def delete_onepa_events(self, *, onepa_eventids: List[int]) -> EventsBulkDeleteResult:
+        deleted = await self.db.fetch_all(query=DELETE_ONEPA_EVENTS_QUERY, values={"onepa_eventids": onepa_eventids})
+        return EventsBulkDeleteResult(deleted=len(deleted))
 
     async def delete_events(self) -> None:
         await self.db.execute(query="DELETE from events")
-        return None
\ No newline at end of file
+        return None
@@ -6,7 +6,7 @@ Update - attributes that can be updated - used at PUT requests
 InDB - attributes present on any resource coming out of the database
 Public - attributes present on public facing resources being returned from GET, POST, and PUT requests
 """
-from typing import Optional
+from typing import NamedTuple, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -41,13 +41,15 @@ class EventsCreate(EventsBase):
     lat: float
     lng: float
     address: str
+    # hash of the source record, set by ingestion to detect changes between runs
+    content_hash: Optional[str]
 
 
 class EventsUpdate(EventsBase):
     pass
 
 
-class EventsInDB(EventsBase):
+class EventsInDB(IDModelMixin, EventsBase):
     start_time: datetime
     end_time: datetime
     name: str
@@ -57,7 +59,93 @@ class EventsInDB(EventsBase):
     lng: float
     address: str
     onepa_eventid: Optional[int]
+    distance: Optional[float]
+    cc_name: Optional[str]
+    cc_distance_km: Optional[float]
+    rc_name: Optional[str]
+    rc_distance_km: Optional[float]
 
 class EventsPublic(EventsBase):
     lat: float
     lng: float
+    distance: Optional[float]
+    # nearest community club and residents' committee, assigned when the event was stored
+    cc_name: Optional[str]
+    cc_distance_km: Optional[float]
+    rc_name: Optional[str]
+    rc_distance_km: Optional[float]
+
+
+class EventRow(NamedTuple):
+    """
+    Lightweight read-only event for list endpoints: built straight from a database record
+    and encoded by app.core.serialisation without going through EventsInDB/EventsPublic.
+    Fields other than id are the EventsPublic fields, in the same order.
+    """
+    id: int
+    start_time: datetime
+    end_time: datetime
+    name: str
+    category: str
+    description: str
+    url: Optional[str]
+    organizer: Optional[str]
+    onepa_eventid: Optional[int]
+    address: str
+    lat: float
+    lng: float
+    distance: Optional[float]
+    cc_name: Optional[str]
+    cc_distance_km: Optional[float]
+    rc_name: Optional[str]
+    rc_distance_km: Optional[float]
+
+    @classmethod
+    def from_record(cls, record) -> "EventRow":
+        return cls(
+            record["id"], record["start_time"], record["end_time"], record["name"], record["category"],
+            record["description"], record["url"], record["organizer"], record["onepa_eventid"],
+            record["address"], record["lat"], record["lng"],
+            # only selected by geo queries
+            record.get("distance"),
+            record["cc_name"], record["cc_distance_km"], record["rc_name"], record["rc_distance_km"],
+        )
+
+
+class EventsBulkUpsertResult(CoreModel):
+    inserted: int
+    updated: int
+    unchanged: int
+
+
+class EventsBulkDeleteResult(CoreModel):
+    deleted: int
+
+
+class EventsCacheStats(CoreModel):
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+    in_flight_queries: int
+    coalesced_queries: int
+    rejected_queries: int
+
+
+class EventsFilter(CoreModel):
+    """
+    Query parameters accepted by the events listing
+    """
+    lat: Optional[float]
+    lng: Optional[float]
+    radius_km: Optional[float]
+    start: Optional[datetime]
+    end: Optional[datetime]
+    category: Optional[CategoryType]
+    # a community club or residents' committee name
+    kampong: Optional[str]
+
+    @property
+    def is_geo_query(self) -> bool:
+        return self.lat is not None and self.lng is not None
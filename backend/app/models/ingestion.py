@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.models.core import CoreModel
+
+
+class IngestionRunStats(CoreModel):
+    started_at: datetime
+    finished_at: Optional[datetime]
+    duration_seconds: Optional[float]
+    source_events: int = 0
+    # unchanged since the last run, by content hash
+    unchanged: int = 0
+    # changed, but not matched to a community club
+    skipped: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    errors: int = 0
+
+
+class IngestionState(CoreModel):
+    """
+    Persisted between onepa ingestion runs.
+    """
+    # eventId -> content hash of events left out of the database, so they aren't re-matched every run
+    skipped: Dict[int, str] = {}
+    # the outlet matcher's reference names the skipped events were checked against
+    matcher_fingerprint: Optional[str]
+    last_checkpoint: Optional[datetime]
+    runs: List[IngestionRunStats] = []
+
+
+class IngestionStatus(CoreModel):
+    running: bool
+    # when the current run started, if one is running
+    running_since: Optional[datetime]
+    last_run: Optional[IngestionRunStats]
+    last_error: Optional[str]
+    last_error_at: Optional[datetime]
@@ -7,28 +7,29 @@ Bot for directing new joiners to their group
 
 import logging
 import os
-import requests
 import sqlite3
 import sys
 from dateutil import parser
-from datetime import datetime, timedelta
-from geopy import distance
+from datetime import timedelta
 
 from telegram import Update, ParseMode
 from telegram.ext import (
     CallbackContext
 )
 from telegram.ext import Updater, CommandHandler
-import pandas as pd
 
 sys.path.append('../')
 from listener.psa_listener import ALL_KAMPONGS
+from listener.reference_data import community_clubs_by_chat_id
+from listener.events_api import events_api
 from moderator import moderator
 
 
 BOT_TOKEN = os.getenv('PSA_BROADCASTER_BOT_TOKEN')
 BROADCAST_POLL_INTERVAL = 10  # in seconds
 EVENT_AGGREGATION_INTERVAL = int(os.getenv('EVENT_AGGREGATION_INTERVAL'))
+EVENTS_PER_CATEGORY = 2
+EVENTS_WITHIN_DAYS = 7
 
 # Enable logging
 logging.basicConfig(
@@ -37,14 +38,6 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-CC_LOCATION = pd.read_csv('data/cc_name_coords_link.csv')
-CHAT_ID_LOCATION_MAPPING = {}
-for _, row in CC_LOCATION.iterrows():
-    if not pd.isna(row['chat_id']):
-        chat_id = row['chat_id']
-        lat, lng = row['lat'], row['long']
-        CHAT_ID_LOCATION_MAPPING[chat_id] = (lat, lng)
-
 
 def fetch_and_send(context: CallbackContext):
     kampong = context.job.context['kampong']
@@ -64,42 +57,16 @@ def fetch_and_send(context: CallbackContext):
         context.bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN)
 
 
-def filter_events(events, chat_id):
-    # Sanity checks
-    logger.info(CHAT_ID_LOCATION_MAPPING)
-    filter_count = 0
-
-    official_mapping = {}
-    independent_mapping = {}
+def filter_events(events):
+    """
+    Picks the 2 nearest official events and the nearest independent event. The events API
+    has already limited them to the week ahead and sorted each category by distance.
+    """
+    official = [event for event in events if event["category"] == "official"][:2]
+    independent = [event for event in events if event["category"] != "official"][:1]
+    logger.info(f"Nearest events: {[event['distance'] for event in official + independent]}")
 
-    for event in events:
-        # TODO: better time check
-        now = datetime.now()
-        # TODO: return timezone info in events API response
-        event_time = parser.parse(event['start_time']).replace(tzinfo=None) + timedelta(hours=8)
-        is_within_one_week_ahead = timedelta(seconds=0) < (event_time - now) < timedelta(days=7)
-        if not is_within_one_week_ahead:
-            filter_count += 1
-            continue
-
-        kampong_latlng = CHAT_ID_LOCATION_MAPPING[chat_id]
-        lat, lng = event["lat"], event["lng"]
-        dist = distance.distance(kampong_latlng, (lat, lng)).kilometers
-        if event["category"] == "official":
-            official_mapping[dist] = event
-        else:
-            independent_mapping[dist] = event
-
-    logging.info(f"independents {independent_mapping}")
-
-    # TODO: get top 3 by nearest location
-    official = sorted(official_mapping.keys())[:2]
-    independent = sorted(independent_mapping.keys())[:1]
-    keys = [official[0]] + independent + [official[1]]
-    logger.info(f"Nearest locations: {keys}. Filtered out {filter_count} entries outside of 1 week window.")
-    dist_mapping = {**official_mapping, **independent_mapping}
-
-    return [dist_mapping[k] for k in keys]
+    return official[:1] + independent + official[1:]
 
 
 def format_time(time):
@@ -138,10 +105,17 @@ def aggregate_events(context: CallbackContext):
     kampong = context.job.context['kampong']
     chat_id = context.job.context['chat_id']
 
-    events = requests.get("http://server:8000/api/events").json()
-    logger.info(f"{events[0]}")
+    cc = community_clubs_by_chat_id()[chat_id]
+    params = {
+        'lat': cc.lat,
+        'lng': cc.lng,
+        'k': EVENTS_PER_CATEGORY,
+        'within_days': EVENTS_WITHIN_DAYS,
+    }
+    events, _ = events_api.get_json('/nearest', params)
+    logger.info(f"{len(events)} nearest events to {cc.name} in the week ahead")
 
-    message = format_events(filter_events(events, chat_id))
+    message = format_events(filter_events(events))
 
     context.bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN)
 
@@ -171,14 +145,7 @@ def broadcast_start(update: Update, context: CallbackContext):
     context.job_queue.run_repeating(fetch_and_send, interval=BROADCAST_POLL_INTERVAL, context=job_context)
 
 
-def main() -> None:
-    """Run the bot."""
-    # Create the Updater and pass it your bot's token.
-    updater = Updater(BOT_TOKEN)
-
-    # Get the dispatcher to register handlers
-    dispatcher = updater.dispatcher
-
+def add_handlers(dispatcher) -> None:
     # add psa broadcaster
     dispatcher.add_handler(CommandHandler('broadcaststart', broadcast_start))
 
@@ -188,6 +155,15 @@ def main() -> None:
     # add kang ren's event broadcaster here
     dispatcher.add_handler(CommandHandler('eventbroadcaststart', broadcast_events))
 
+
+def main() -> None:
+    """Run the bot."""
+    # Create the Updater and pass it your bot's token.
+    updater = Updater(BOT_TOKEN)
+
+    # Get the dispatcher to register handlers
+    add_handlers(updater.dispatcher)
+
     # Start the Bot
     updater.start_polling()
 
@@ -7,7 +7,10 @@ from telegram.ext import Updater, InlineQueryHandler, CallbackContext
 from telegram.utils.helpers import escape_markdown
 
 sys.path.append('../')
-from listener.util import format_event, is_valid_postal, search_events, search_postal
+from listener.util import format_event, is_valid_postal, search_events_page, search_postal
+
+# Telegram accepts at most 50 results per inline query
+MAX_INLINE_RESULTS = 50
 
 # Enable logging
 logging.basicConfig(
@@ -33,7 +36,7 @@ def inlinequery(update: Update, context: CallbackContext) -> None:
         logger.info(f"Cannot find address for {query}")
         return
 
-    events = search_events(location, None)
+    events, _ = search_events_page(location, None, limit=MAX_INLINE_RESULTS)
     logger.info(
         f"query: {query}\n"
         f"result: {len(events)} events\n"
@@ -0,0 +1,121 @@
+"""
+Dispatching updates from different chats concurrently.
+
+Updates are partitioned by chat over a fixed set of worker threads, each with its own bounded queue. All
+updates from one chat go through the same worker and are handled in the order they arrived, so a
+conversation's state moves exactly as it would with the default one-at-a-time dispatcher. Only other
+chats stop waiting behind a slow OneMap or events API call. When a worker's queue is full, taking new
+updates from telegram waits for it.
+"""
+
+import logging
+import threading
+import time
+from queue import Queue
+from typing import Callable, List
+
+from telegram import Update
+from telegram.ext import Dispatcher
+
+from events_api import LatencyMetrics
+
+logger = logging.getLogger(__name__)
+
+CHAT_WORKERS = 8
+CHAT_QUEUE_SIZE = 100
+
+
+def partition_key(update: object) -> int:
+    if isinstance(update, Update):
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+        return update.update_id
+    return 0
+
+
+class ChatPartitionedExecutor:
+    def __init__(self, process: Callable[[object], None], workers: int = CHAT_WORKERS,
+                 queue_size: int = CHAT_QUEUE_SIZE) -> None:
+        self.process = process
+        self.queues: List[Queue] = [Queue(maxsize=queue_size) for _ in range(workers)]
+        self.max_depths = [0] * workers
+        self.latency = LatencyMetrics()
+        self.lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self.work, args=(i,), name=f'chat_worker_{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, update: object) -> None:
+        i = partition_key(update) % len(self.queues)
+        self.queues[i].put((time.perf_counter(), update))
+        depth = self.queues[i].qsize()
+        with self.lock:
+            self.max_depths[i] = max(self.max_depths[i], depth)
+
+    def work(self, i: int) -> None:
+        queue = self.queues[i]
+        while True:
+            item = queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            queued_at, update = item
+            start = time.perf_counter()
+            self.latency.record('queue_wait', 'ok', start - queued_at)
+            try:
+                self.process(update)
+                outcome = 'ok'
+            except Exception:
+                logger.exception('Error processing update')
+                outcome = 'error'
+            self.latency.record('handle', outcome, time.perf_counter() - start)
+            queue.task_done()
+
+    def join(self) -> None:
+        """Waits until every update submitted so far has been handled."""
+        for queue in self.queues:
+            queue.join()
+
+    def shutdown(self) -> None:
+        """Handles what is already queued, then stops the workers."""
+        if not any(thread.is_alive() for thread in self.threads):
+            return
+        for queue in self.queues:
+            queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def metrics(self) -> dict:
+        with self.lock:
+            max_depths = list(self.max_depths)
+        depths = [queue.qsize() for queue in self.queues]
+        return {
+            'workers': len(self.queues),
+            'queued': sum(depths),
+            'queue_depths': depths,
+            'max_queue_depths': max_depths,
+            'latency': self.latency.snapshot(),
+        }
+
+
+class ConcurrentDispatcher(Dispatcher):
+    """A Dispatcher whose update loop hands each update to a ChatPartitionedExecutor instead of handling it."""
+
+    def __init__(self, *args, chat_workers: int = CHAT_WORKERS, chat_queue_size: int = CHAT_QUEUE_SIZE,
+                 **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.chat_executor = ChatPartitionedExecutor(
+            super().process_update, workers=chat_workers, queue_size=chat_queue_size
+        )
+
+    def process_update(self, update: object) -> None:
+        self.chat_executor.submit(update)
+
+    def stop(self) -> None:
+        super().stop()
+        self.chat_executor.shutdown()
@@ -11,6 +11,7 @@ from telegram.ext import (
     CallbackContext, 
 )
 
+from events_api import EventsApiUnavailable, events_api
 from util import format_datetime, is_valid_postal, parse_date, reverse_geocode, search_postal
 
 
@@ -63,6 +64,11 @@ def get_location(update: Update, context: CallbackContext) -> int:
     if event_location is not None:
         logger.info(f"Location of event is at {event_location.latitude}, {event_location.longitude}")
         location = reverse_geocode(event_location.latitude, event_location.longitude)
+        if not location:
+            update.message.reply_text('🤔 Cannot find an address near this pin... Try again or key in the postal code?',
+                                      reply_markup=ReplyKeyboardRemove(),
+                                      parse_mode=ParseMode.MARKDOWN)
+            return GET_LOCATION
     elif event_postal_code is not None:
         logger.info(f"Postal of the event is at {event_postal_code}")
         if not is_valid_postal(event_postal_code):
@@ -218,7 +224,14 @@ def get_event_confirmation(update: Update, context: CallbackContext) -> int:
             },
         }
         logger.info(f"data: {data}")
-        requests.post("http://server:8000/api/events/", json=data)
+        try:
+            events_api.post_json('/', data)
+        except (EventsApiUnavailable, requests.HTTPError) as e:
+            logger.warning(f"Could not create event: {e}")
+            update.message.reply_text(
+                'Sorry, we could not save your event just now. Please send "confirm" again in a while.'
+            )
+            return GET_EVENT_CONFIRMATION_CHOICE
         update.message.reply_text(
             'Your event has been created!'
         )
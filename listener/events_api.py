@@ -0,0 +1,214 @@
+"""
+Client for the events API shared by the bots.
+
+All calls go through one keep-alive connection pool with connect/read timeouts. Idempotent calls are
+retried with jittered backoff, and a circuit breaker fails calls fast while the API is down. GET responses
+are kept for a short TTL and then revalidated with their ETag. Latency is recorded per endpoint.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+EVENTS_API = os.getenv('EVENTS_API', 'http://server:8000/api/events')
+
+CONNECT_TIMEOUT_SECONDS = 3.05
+READ_TIMEOUT_SECONDS = 10
+POOL_SIZE = 16
+
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.2
+BACKOFF_MAX_SECONDS = 2
+RETRY_STATUSES = {502, 503, 504}
+
+# consecutive failed calls that open the circuit, and how long it stays open before a trial call
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30
+
+CACHE_TTL_SECONDS = 30
+CACHE_SIZE = 256
+LATENCY_SAMPLES = 500
+
+
+class EventsApiUnavailable(Exception):
+    """The circuit is open, or the API kept failing through every retry."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Closed lets every call through, half-open lets one trial call through at a time."""
+        with self.lock:
+            state = self.state
+            if state == 'half-open':
+                # the next trial waits another reset period unless this one succeeds
+                self.opened_at = time.monotonic()
+            return state != 'open'
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f'Events API failed {self.failures} times in a row, opening circuit')
+                self.opened_at = time.monotonic()
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[round(q * (len(ordered) - 1))]
+
+
+class LatencyMetrics:
+    def __init__(self, samples: int = LATENCY_SAMPLES) -> None:
+        self.samples = samples
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint: str, outcome: str, seconds: Optional[float] = None) -> None:
+        """seconds is None for calls answered without the network, which only count towards outcomes."""
+        with self.lock:
+            stats = self.endpoints.setdefault(
+                endpoint, {'calls': 0, 'outcomes': {}, 'latencies': deque(maxlen=self.samples)}
+            )
+            stats['calls'] += 1
+            stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+            if seconds is not None:
+                stats['latencies'].append(seconds)
+
+    def snapshot(self) -> dict:
+        """Per endpoint: calls, counts by outcome, and p50/p95/max over the most recent calls, in ms."""
+        with self.lock:
+            result = {}
+            for endpoint, stats in self.endpoints.items():
+                latencies = sorted(stats['latencies'])
+                result[endpoint] = {'calls': stats['calls'], 'outcomes': dict(stats['outcomes'])}
+                if latencies:
+                    result[endpoint].update({
+                        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+                        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+                        'max_ms': round(latencies[-1] * 1000, 1),
+                    })
+            return result
+
+
+class EventsApiClient:
+    def __init__(self, base_url: str = EVENTS_API, *, cache_ttl: float = CACHE_TTL_SECONDS,
+                 max_retries: int = MAX_RETRIES) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.cache_ttl = cache_ttl
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyMetrics()
+        # (path, params) -> (fetched_at, etag, data, headers)
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+    def _request(self, method: str, path: str, *, idempotent: bool = True, **kwargs) -> requests.Response:
+        endpoint = f'{method} {path}'
+        if not self.breaker.allow():
+            self.latency.record(endpoint, 'circuit_open')
+            raise EventsApiUnavailable(f'{endpoint}: circuit open')
+
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            retry_after = None
+            try:
+                response = self.session.request(method, f'{self.base_url}{path}', **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.latency.record(endpoint, type(e).__name__, time.perf_counter() - start)
+                error = repr(e)
+                # a request that may have reached the server is only repeated when repeating is harmless
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+            else:
+                self.latency.record(endpoint, str(response.status_code), time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                error = f'HTTP {response.status_code}'
+                retry_after = response.headers.get('Retry-After')
+                # our API only sheds load with 503 before doing anything, so that is safe to repeat
+                retryable = idempotent or response.status_code == 503
+                response.close()
+
+            if not retryable or attempt == self.max_retries:
+                break
+            delay = min(float(retry_after), BACKOFF_MAX_SECONDS) if retry_after and retry_after.isdigit() else \
+                random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            logger.info(f'Retrying {endpoint} in {delay:.2f}s after {error}')
+            time.sleep(delay)
+
+        self.breaker.record_failure()
+        raise EventsApiUnavailable(f'{endpoint}: {error}')
+
+    def get_json(self, path: str = '/', params: Optional[dict] = None) -> Tuple[object, CaseInsensitiveDict]:
+        """
+        :return: decoded body, response headers. Served from the cache within its TTL, then revalidated.
+        """
+        params = params or {}
+        key = (path, tuple(sorted(params.items())))
+        with self.cache_lock:
+            cached = self.cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            self.latency.record(f'GET {path}', 'cache_hit')
+            return cached[2], cached[3]
+
+        headers = {'If-None-Match': cached[1]} if cached is not None and cached[1] else {}
+        response = self._request('GET', path, params=params, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            data, response_headers = cached[2], cached[3]
+        else:
+            response.raise_for_status()
+            data, response_headers = response.json(), CaseInsensitiveDict(response.headers)
+
+        with self.cache_lock:
+            self.cache[key] = (time.monotonic(), response_headers.get('ETag'), data, response_headers)
+            self.cache.move_to_end(key)
+            while len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return data, response_headers
+
+    def post_json(self, path: str, payload: dict) -> object:
+        response = self._request('POST', path, json=payload, idempotent=False)
+        response.raise_for_status()
+        return response.json()
+
+    def metrics(self) -> dict:
+        return {'circuit': self.breaker.state, 'endpoints': self.latency.snapshot()}
+
+
+events_api = EventsApiClient()
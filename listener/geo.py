@@ -0,0 +1,52 @@
+"""
+Vectorised great-circle distances, shared by the bots (listener.spatial_index) and the api
+(app.core.kampongs, which gets this directory mounted as /backend/listener), so there is one earth radius.
+
+Points are held as contiguous float64 arrays of radians, and distances for a whole batch come from one
+numpy expression instead of a geopy call per pair. Haversine on a sphere of the earth's mean radius
+is within 0.6% (about 150 m across the island) of the ellipsoidal geodesic geopy computes,
+see scripts/bench_geo.py.
+"""
+
+from typing import Iterable, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """
+    Distance in km between points given in radians. Arguments broadcast against each other,
+    so a scalar against arrays is one-to-many and a column against a row is many-to-many.
+    """
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class Points:
+    def __init__(self, lats: Iterable[float], lngs: Iterable[float]) -> None:
+        self.lat = np.ascontiguousarray(np.radians(np.asarray(list(lats), dtype=np.float64)))
+        self.lng = np.ascontiguousarray(np.radians(np.asarray(list(lngs), dtype=np.float64)))
+
+    @classmethod
+    def from_pairs(cls, pairs: Sequence[Tuple[float, float]]) -> 'Points':
+        return cls((lat for lat, _ in pairs), (lng for _, lng in pairs))
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def distances_from(self, lat: float, lng: float) -> np.ndarray:
+        """km from (lat, lng) in degrees to every point."""
+        return haversine_km(np.radians(lat), np.radians(lng), self.lat, self.lng)
+
+    def distance_matrix(self, other: 'Points') -> np.ndarray:
+        """len(self) x len(other) km between every pair."""
+        return haversine_km(self.lat[:, None], self.lng[:, None], other.lat[None, :], other.lng[None, :])
+
+    def nearest(self, lat: float, lng: float) -> Tuple[int, float]:
+        """Index of the point nearest (lat, lng), and its distance in km."""
+        distances = self.distances_from(lat, lng)
+        i = int(np.argmin(distances))
+        return i, float(distances[i])
+
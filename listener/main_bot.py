@@ -1,16 +1,28 @@
+import json
+import logging
 import os
+from queue import Queue
 
 from telegram import Update, ParseMode
-from telegram.ext import Updater, CommandHandler, CallbackContext
+from telegram.ext import Updater, CommandHandler, CallbackContext, ExtBot, JobQueue
+from telegram.utils.request import Request
 
 import create_event_service
+from concurrent_dispatcher import ConcurrentDispatcher
 import search_event_service
 from start_convo import start_convo, START_CONVO
 from matching import matching_convo
 from psa_listener import psa_listener
+from events_api import events_api
+from postal_geocoder import postal_geocoder
+from reverse_geocoder import reverse_geocoder
 
 
 BOT_TOKEN = os.getenv('CONCIERGE_BOT_TOKEN')
+METRICS_LOG_INTERVAL_SECONDS = int(os.getenv('METRICS_LOG_INTERVAL_SECONDS', 300))
+CHAT_WORKERS = int(os.getenv('CHAT_WORKERS', 8))
+
+logger = logging.getLogger(__name__)
 
 
 def help_command(update: Update, context: CallbackContext) -> None:
@@ -18,14 +30,18 @@ def help_command(update: Update, context: CallbackContext) -> None:
     update.message.reply_text(START_CONVO, parse_mode=ParseMode.MARKDOWN)
 
 
-def main() -> None:
-    """Run the bot."""
-    # Create the Updater and pass it your bot's token.
-    updater = Updater(BOT_TOKEN)
+def log_metrics(context: CallbackContext) -> None:
+    logger.info(f'events_api metrics: {json.dumps(events_api.metrics())}')
+    logger.info(f'postal_geocoder metrics: {json.dumps(postal_geocoder.metrics())}')
+    logger.info(f'reverse_geocoder metrics: {json.dumps(reverse_geocoder.metrics())}')
+    logger.info(f'dispatcher metrics: {json.dumps(context.dispatcher.chat_executor.metrics())}')
 
-    # Get the dispatcher to register handlers
-    dispatcher = updater.dispatcher
 
+def build_reverse_geocoder_index(context: CallbackContext) -> None:
+    reverse_geocoder.index()
+
+
+def add_handlers(dispatcher) -> None:
     # add start conversation - this is the default conversation when the bot is first started
     dispatcher.add_handler(start_convo)
 
@@ -42,6 +58,23 @@ def main() -> None:
     # add help
     dispatcher.add_handler(CommandHandler('help', help_command))
 
+
+def main() -> None:
+    """Run the bot."""
+    # Create the Updater with a dispatcher that handles different chats concurrently. Every chat worker
+    # may be calling the Bot API at once, on top of the connections the Updater itself needs.
+    bot = ExtBot(BOT_TOKEN, request=Request(con_pool_size=CHAT_WORKERS + 8))
+    dispatcher = ConcurrentDispatcher(bot, Queue(), job_queue=JobQueue(), chat_workers=CHAT_WORKERS)
+    dispatcher.job_queue.set_dispatcher(dispatcher)
+    updater = Updater(dispatcher=dispatcher, workers=None)
+
+    # Get the dispatcher to register handlers
+    add_handlers(updater.dispatcher)
+
+    updater.job_queue.run_repeating(log_metrics, interval=METRICS_LOG_INTERVAL_SECONDS)
+    # off the startup path, but before the first location pin needs it
+    updater.job_queue.run_once(build_reverse_geocoder_index, when=0)
+
     # Start the Bot
     updater.start_polling()
 
@@ -6,15 +6,15 @@ Bot for directing new joiners to their group
 """
 
 import logging
-from typing import Tuple
+from typing import List, Tuple, Union
 
-import pandas as pd
-from geopy import distance
 from telegram import ReplyKeyboardRemove, Update, InlineKeyboardButton, InlineKeyboardMarkup, ParseMode
 from telegram.ext import (
     ConversationHandler,
     CallbackContext, CommandHandler, MessageHandler, Filters, CallbackQueryHandler, )
 
+from reference_data import CommunityClub, ResidentsCommittee
+from spatial_index import community_club_index, residents_committee_index
 from util import is_valid_postal, search_postal
 
 # Enable logging
@@ -31,7 +31,10 @@ ADDR_CONFIRMATION_NEGATIVE = 'Nope wrong liao 👎'
 PLEDGE_CONFIRMATION_POSITIVE = 'Okay I promise! 😇'
 PLEDGE_CONFIRMATION_NEGATIVE = 'Nope'
 GROUP_IDENTIFIER = '[Kaypoh @ Kampong]'
-CC_LOCATION = pd.read_csv('data/cc_name_coords_link.csv')
+
+# a resident is matched to their RC's group when one has been created this close by, otherwise to their CC's
+RC_MATCH_RADIUS_KM = 1
+ALTERNATIVE_GROUPS = 2
 
 
 def join(update: Update, context: CallbackContext) -> int:
@@ -125,28 +128,30 @@ def pledge(update: Update, context: CallbackContext) -> int:
 
 def match_group(update: Update, context: CallbackContext) -> int:
     query = update.callback_query
-    chosen_group, link = find_closest(context.user_data['lat_lng'])
+    chosen, *alternatives = find_groups(context.user_data['lat_lng'])
+    chosen_group, link = chosen.name, chosen.group_link
     logger.info("Chosen group: %s Group link: %s", chosen_group, link)
     query.answer("Thanks for making our community a safe and pleasant space for all!")
     query.message.reply_text(
         f'Join in and have fun kay-pohing 😎\n'
         f'Telegram group name: {GROUP_IDENTIFIER} {chosen_group}\nTelegram link: {link}\n'
+        + ''.join(f'\nAlso nearby: {GROUP_IDENTIFIER} {group.name}\nTelegram link: {group.group_link}\n'
+                  for group in alternatives)
     )
 
     return ConversationHandler.END
 
 
-def find_closest(lat_lng: Tuple[float, float]):
-    min_dist = 9999
-    chosen_rc = ''
-    link = ''
-    for _, row in CC_LOCATION.iterrows():
-        curr_dist = distance.distance(lat_lng, (row['lat'], row['long'])).kilometers
-        if curr_dist < min_dist:
-            chosen_rc = row['name']
-            min_dist = curr_dist
-            link = row['group_link']
-    return chosen_rc, link
+def find_groups(lat_lng: Tuple[float, float]) -> List[Union[ResidentsCommittee, CommunityClub]]:
+    """
+    :return: the group to join, then up to ALTERNATIVE_GROUPS nearby CC groups that have been created
+    """
+    # onemap gives coordinates as strings
+    lat, lng = map(float, lat_lng)
+    rcs = [rc for rc, _ in residents_committee_index().within(lat, lng, RC_MATCH_RADIUS_KM) if rc.has_group]
+    ccs = [cc for cc, _ in community_club_index().nearest(lat, lng, k=ALTERNATIVE_GROUPS + 1)]
+    chosen, *others = rcs[:1] + ccs
+    return [chosen] + [group for group in others if group.has_group][:ALTERNATIVE_GROUPS]
 
 
 def reject_pledge(update: Update, context: CallbackContext) -> int:
@@ -0,0 +1,220 @@
+"""
+Postal code geocoding with a two-tier cache.
+
+Lookups are answered from an in-memory LRU, then from a SQLite file shared across restarts, and only then
+from the geocoder backend (OneMap by default). Both tiers keep found addresses for POSTAL_CACHE_TTL_SECONDS
+and postal codes the backend doesn't know for POSTAL_NEGATIVE_TTL_SECONDS. Backend errors are not cached.
+"""
+
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import requests
+
+try:
+    from events_api import LatencyMetrics
+except ImportError:  # imported from another bot as listener.postal_geocoder
+    from listener.events_api import LatencyMetrics
+
+logger = logging.getLogger(__name__)
+
+ONEMAP_SEARCH_URL = os.getenv('ONEMAP_SEARCH_URL', 'https://developers.onemap.sg/commonapi/search')
+POSTAL_CACHE_PATH = os.getenv('POSTAL_CACHE_PATH', 'data/postal_cache.sqlite3')
+POSTAL_CACHE_TTL_SECONDS = int(os.getenv('POSTAL_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+POSTAL_NEGATIVE_TTL_SECONDS = int(os.getenv('POSTAL_NEGATIVE_TTL_SECONDS', 24 * 3600))
+POSTAL_MEMORY_CACHE_SIZE = 4096
+
+CONNECT_TIMEOUT_SECONDS = 3.05
+READ_TIMEOUT_SECONDS = 10
+
+CREATE_TABLE = '''
+CREATE TABLE IF NOT EXISTS postal_codes (
+    postal_code TEXT PRIMARY KEY,
+    address TEXT,
+    latitude TEXT,
+    longitude TEXT,
+    fetched_at REAL NOT NULL
+)
+'''
+
+
+class Location(NamedTuple):
+    address: str
+    latitude: str
+    longitude: str
+
+
+class CacheEntry(NamedTuple):
+    location: Optional[Location]  # None when the backend doesn't know the postal code
+    fetched_at: float
+
+
+class OneMapGeocoder:
+    def __init__(self, url: str = ONEMAP_SEARCH_URL) -> None:
+        self.url = url
+        self.session = requests.Session()
+
+    def search(self, postal_code: str) -> Optional[Location]:
+        query = {'searchVal': postal_code, 'returnGeom': 'Y', 'getAddrDetails': 'Y'}
+        response = self.session.get(self.url, params=query, timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))
+        response.raise_for_status()
+        results = response.json()['results']
+        if not results:
+            return None
+        result = results[0]
+        return Location(result['ADDRESS'].title(), result['LATITUDE'], result['LONGITUDE'])
+
+
+class SqliteCache:
+    def __init__(self, path: str = POSTAL_CACHE_PATH) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # handlers run on several threads, which share the connection under the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(CREATE_TABLE)
+        self.lock = threading.Lock()
+
+    def get(self, postal_code: str) -> Optional[CacheEntry]:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT address, latitude, longitude, fetched_at FROM postal_codes WHERE postal_code = ?',
+                (postal_code,),
+            ).fetchone()
+        if row is None:
+            return None
+        address, latitude, longitude, fetched_at = row
+        return CacheEntry(None if address is None else Location(address, latitude, longitude), fetched_at)
+
+    def known_locations(self) -> List[Tuple[str, Location]]:
+        """(postal_code, Location) of every postal code found, however old."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT postal_code, address, latitude, longitude FROM postal_codes WHERE address IS NOT NULL'
+            ).fetchall()
+        return [(postal_code, Location(*location)) for postal_code, *location in rows]
+
+    def put_many(self, entries: Iterable[tuple]) -> None:
+        """entries are (postal_code, CacheEntry)"""
+        rows = [(postal_code, *(entry.location or (None, None, None)), entry.fetched_at)
+                for postal_code, entry in entries]
+        with self.lock:
+            self.connection.executemany('INSERT OR REPLACE INTO postal_codes VALUES (?, ?, ?, ?, ?)', rows)
+
+    def put(self, postal_code: str, entry: CacheEntry) -> None:
+        self.put_many([(postal_code, entry)])
+
+
+class PostalGeocoder:
+    def __init__(self, backend=None, disk: Optional[SqliteCache] = None, *,
+                 ttl: float = POSTAL_CACHE_TTL_SECONDS, negative_ttl: float = POSTAL_NEGATIVE_TTL_SECONDS,
+                 memory_size: int = POSTAL_MEMORY_CACHE_SIZE) -> None:
+        """backend is anything with search(postal_code) -> Optional[Location]; OneMap by default."""
+        self.backend = backend or OneMapGeocoder()
+        self._disk = disk
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.lookups = {'memory': 0, 'disk': 0, 'backend': 0}
+        self.upstream = LatencyMetrics()
+
+    @property
+    def disk(self) -> SqliteCache:
+        # opened on first lookup so importing the bots doesn't touch data/
+        if self._disk is None:
+            self._disk = SqliteCache()
+        return self._disk
+
+    def fresh(self, entry: Optional[CacheEntry]) -> bool:
+        if entry is None:
+            return False
+        ttl = self.ttl if entry.location is not None else self.negative_ttl
+        return time.time() - entry.fetched_at < ttl
+
+    def remember(self, postal_code: str, entry: CacheEntry) -> None:
+        with self.lock:
+            self.memory[postal_code] = entry
+            self.memory.move_to_end(postal_code)
+            while len(self.memory) > self.memory_size:
+                self.memory.popitem(last=False)
+
+    def count(self, tier: str) -> None:
+        with self.lock:
+            self.lookups[tier] += 1
+
+    def fetch(self, postal_code: str) -> CacheEntry:
+        start = time.perf_counter()
+        try:
+            location = self.backend.search(postal_code)
+        except Exception as e:
+            self.upstream.record('search', type(e).__name__, time.perf_counter() - start)
+            raise
+        self.upstream.record('search', 'found' if location else 'not_found', time.perf_counter() - start)
+        return CacheEntry(location, time.time())
+
+    def search(self, postal_code: str) -> Optional[Location]:
+        with self.lock:
+            entry = self.memory.get(postal_code)
+        if self.fresh(entry):
+            self.count('memory')
+            return entry.location
+
+        entry = self.disk.get(postal_code)
+        if self.fresh(entry):
+            self.count('disk')
+        else:
+            self.count('backend')
+            entry = self.fetch(postal_code)
+            self.disk.put(postal_code, entry)
+        self.remember(postal_code, entry)
+        return entry.location
+
+    def prewarm(self, path: str) -> dict:
+        """
+        Fills the disk cache from a CSV with a postal_code column. Rows that also have address, latitude and
+        longitude are stored as they are, the rest are looked up unless already cached.
+        """
+        counts = {'stored': 0, 'fetched': 0, 'cached': 0, 'failed': 0}
+        with open(path) as f:
+            given = []
+            for row in csv.DictReader(f):
+                postal_code = row['postal_code'].strip()
+                if row.get('address') and row.get('latitude') and row.get('longitude'):
+                    location = Location(row['address'], row['latitude'], row['longitude'])
+                    given.append((postal_code, CacheEntry(location, time.time())))
+                    continue
+                if self.fresh(self.disk.get(postal_code)):
+                    counts['cached'] += 1
+                    continue
+                try:
+                    self.disk.put(postal_code, self.fetch(postal_code))
+                    counts['fetched'] += 1
+                except Exception as e:
+                    logger.warning(f'Could not prewarm {postal_code}: {e!r}')
+                    counts['failed'] += 1
+        self.disk.put_many(given)
+        counts['stored'] = len(given)
+        return counts
+
+    def metrics(self) -> dict:
+        with self.lock:
+            lookups = dict(self.lookups)
+            memory_entries = len(self.memory)
+        total = sum(lookups.values())
+        return {
+            'lookups': lookups,
+            'hit_rate': round((lookups['memory'] + lookups['disk']) / total, 4) if total else None,
+            'memory_entries': memory_entries,
+            'upstream': self.upstream.snapshot().get('search', {}),
+        }
+
+
+postal_geocoder = PostalGeocoder()
@@ -0,0 +1,63 @@
+"""
+Reference data read from data/ on first use and kept for the life of the process,
+so starting a bot doesn't wait on data it may not need yet.
+"""
+
+import csv
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+CC_COORDS_PATH = 'data/cc_name_coords_link.csv'
+RC_COORDS_PATH = 'data/rc_name_coords_link.csv'
+MISSING = ('', 'NA')
+GROUP_NOT_CREATED = 'not_created'
+
+
+class CommunityClub(NamedTuple):
+    name: str
+    lat: float
+    lng: float
+    group_link: str
+    chat_id: Optional[int]
+
+    @property
+    def has_group(self) -> bool:
+        return self.group_link != GROUP_NOT_CREATED
+
+
+class ResidentsCommittee(NamedTuple):
+    name: str
+    lat: float
+    lng: float
+    group_link: str
+
+    @property
+    def has_group(self) -> bool:
+        return self.group_link != GROUP_NOT_CREATED
+
+
+@lru_cache(maxsize=None)
+def community_clubs() -> List[CommunityClub]:
+    with open(CC_COORDS_PATH) as f:
+        return [
+            CommunityClub(
+                row['name'], float(row['lat']), float(row['long']), row['group_link'],
+                None if row['chat_id'] in MISSING else int(float(row['chat_id'])),
+            )
+            for row in csv.DictReader(f)
+        ]
+
+
+@lru_cache(maxsize=None)
+def community_clubs_by_chat_id() -> Dict[int, CommunityClub]:
+    """Community clubs whose group chat has been created."""
+    return {cc.chat_id: cc for cc in community_clubs() if cc.chat_id is not None}
+
+
+@lru_cache(maxsize=None)
+def residents_committees() -> List[ResidentsCommittee]:
+    with open(RC_COORDS_PATH) as f:
+        return [
+            ResidentsCommittee(row['name'], float(row['lat']), float(row['long']), row['group_link'])
+            for row in csv.DictReader(f)
+        ]
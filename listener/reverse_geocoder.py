@@ -0,0 +1,160 @@
+"""
+Reverse geocoding of location pins without leaving the process when possible.
+
+A pin resolves to the nearest address the postal code cache already knows, if one is within
+REVERSE_GEOCODE_MAX_KM, using a spatial index over those addresses. Otherwise it falls back to Nominatim for
+the postcode and OneMap for its address, which also teaches the local index that address. Results are cached
+by coordinate rounded to REVERSE_GEOCODE_DECIMALS places, about 11 m at 4.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+try:
+    from events_api import LatencyMetrics
+    from postal_geocoder import Location, PostalGeocoder, postal_geocoder
+    from spatial_index import SpatialIndex
+except ImportError:  # imported from another bot as listener.reverse_geocoder
+    from listener.events_api import LatencyMetrics
+    from listener.postal_geocoder import Location, PostalGeocoder, postal_geocoder
+    from listener.spatial_index import SpatialIndex
+
+logger = logging.getLogger(__name__)
+
+REVERSE_GEOCODE_MAX_KM = float(os.getenv('REVERSE_GEOCODE_MAX_KM', 0.1))
+REVERSE_GEOCODE_DECIMALS = 4
+REVERSE_GEOCODE_CACHE_SIZE = 4096
+NOMINATIM_USER_AGENT = 'kaypohBotGeocoder'
+NOMINATIM_TIMEOUT_SECONDS = 10
+
+
+class KnownAddress(NamedTuple):
+    postal_code: str
+    location: Location
+
+    @property
+    def lat(self) -> float:
+        return float(self.location.latitude)
+
+    @property
+    def lng(self) -> float:
+        return float(self.location.longitude)
+
+
+class NominatimPostcodes:
+    def __init__(self) -> None:
+        from geopy.geocoders import Nominatim
+
+        self.locator = Nominatim(user_agent=NOMINATIM_USER_AGENT, timeout=NOMINATIM_TIMEOUT_SECONDS)
+
+    def postcode(self, lat: float, lng: float) -> Optional[str]:
+        location = self.locator.reverse([lat, lng])
+        if location is None:
+            return None
+        return location.raw.get('address', {}).get('postcode')
+
+
+class ReverseGeocoder:
+    def __init__(self, postal_geocoder: PostalGeocoder, remote=None, *, max_km: float = REVERSE_GEOCODE_MAX_KM,
+                 decimals: int = REVERSE_GEOCODE_DECIMALS, cache_size: int = REVERSE_GEOCODE_CACHE_SIZE) -> None:
+        """remote is anything with postcode(lat, lng) -> Optional[str]; Nominatim by default."""
+        self.postal_geocoder = postal_geocoder
+        self._remote = remote
+        self.max_km = max_km
+        self.decimals = decimals
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.known = None
+        self._index = None
+        self.outcomes = {'cache': 0, 'local': 0, 'remote': 0, 'not_found': 0}
+        self.remote_latency = LatencyMetrics()
+
+    @property
+    def remote(self):
+        if self._remote is None:
+            self._remote = NominatimPostcodes()
+        return self._remote
+
+    def index(self) -> Optional[SpatialIndex]:
+        """Built from the postal code cache on first use, and rebuilt after the remote finds a new address."""
+        with self.lock:
+            if self.known is None:
+                self.known = {postal_code: KnownAddress(postal_code, location)
+                              for postal_code, location in self.postal_geocoder.disk.known_locations()}
+            if self._index is None and self.known:
+                start = time.perf_counter()
+                self._index = SpatialIndex(list(self.known.values()))
+                logger.info(f'Indexed {len(self.known)} addresses in {time.perf_counter() - start:.3f}s')
+            return self._index
+
+    def learn(self, postal_code: str, location: Location) -> None:
+        self.index()
+        with self.lock:
+            if postal_code not in self.known:
+                self.known[postal_code] = KnownAddress(postal_code, location)
+                self._index = None
+
+    def count(self, outcome: str) -> None:
+        with self.lock:
+            self.outcomes[outcome] += 1
+
+    def nearest_known(self, lat: float, lng: float) -> Optional[Location]:
+        index = self.index()
+        if index is None:
+            return None
+        (known, km), = index.nearest(lat, lng)
+        return known.location if km <= self.max_km else None
+
+    def lookup_remote(self, lat: float, lng: float) -> Optional[Location]:
+        start = time.perf_counter()
+        try:
+            postcode = self.remote.postcode(lat, lng)
+        except Exception as e:
+            self.remote_latency.record('reverse', type(e).__name__, time.perf_counter() - start)
+            raise
+        self.remote_latency.record('reverse', 'found' if postcode else 'not_found', time.perf_counter() - start)
+        if not postcode:
+            return None
+        location = self.postal_geocoder.search(postcode)
+        if location is not None:
+            self.learn(postcode, location)
+        return location
+
+    def reverse(self, lat: float, lng: float) -> Optional[Location]:
+        key = (round(lat, self.decimals), round(lng, self.decimals))
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.outcomes['cache'] += 1
+                return self.cache[key]
+
+        location = self.nearest_known(lat, lng)
+        if location is not None:
+            self.count('local')
+        else:
+            location = self.lookup_remote(lat, lng)
+            self.count('remote' if location is not None else 'not_found')
+
+        with self.lock:
+            self.cache[key] = location
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return location
+
+    def metrics(self) -> dict:
+        with self.lock:
+            outcomes = dict(self.outcomes)
+            indexed = len(self.known) if self.known is not None else None
+        return {
+            'outcomes': outcomes,
+            'indexed_addresses': indexed,
+            'remote': self.remote_latency.snapshot().get('reverse', {}),
+        }
+
+
+reverse_geocoder = ReverseGeocoder(postal_geocoder)
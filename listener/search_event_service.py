@@ -1,6 +1,7 @@
 import json
 import logging
 
+import requests
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, ParseMode, ReplyKeyboardRemove
 from telegram.ext import (
     Dispatcher,
@@ -13,7 +14,8 @@ from telegram.ext import (
 )
 
 from create_event_service import DATETIME_FORMAT_HELPER
-from util import format_date, format_event, is_valid_postal, parse_date, reverse_geocode, search_events, search_postal
+from events_api import EventsApiUnavailable
+from util import format_date, format_event, is_valid_postal, parse_date, reverse_geocode, search_events_page, search_postal
 
 # Enable logging
 logging.basicConfig(
@@ -27,8 +29,8 @@ EVENT_SIZE_PER_PAGE = 5
 LOAD_MORE_EVENTS_CHOICE = 'Gimme gimme more'
 NO_MORE_EVENTS_MSG = "-----\nNo more events in your kampong. Wanna create one? Enter /createevent\n-----"
 DATE_FORMAT_HELPER = '(Enter DD/MM/YYYY e.g. 31/03/2022)'
-def MORE_EVENTS_MSG(num_events_left):
-    return f"-----\nThere are {num_events_left} more events in your kampong\n-----"
+MORE_EVENTS_MSG = "-----\nThere are more events in your kampong\n-----"
+SEARCH_UNAVAILABLE_MSG = 'Sorry, we could not search for events just now. Please try /searchevent again in a while.'
 
 def start(update: Update, context: CallbackContext) -> int:
     update.message.reply_text(
@@ -68,6 +70,11 @@ def get_event_location(update: Update, context: CallbackContext) -> int:
     if event_location is not None:
         logger.info(f"Location of event is at {event_location.latitude}, {event_location.longitude}")
         location = reverse_geocode(event_location.latitude, event_location.longitude)
+        if not location:
+            update.message.reply_text('🤔 Cannot find an address near this pin... Try again or key in the postal code?',
+                                      reply_markup=ReplyKeyboardRemove(),
+                                      parse_mode=ParseMode.MARKDOWN)
+            return GET_EVENT_LOCATION
     elif event_postal_code is not None:
         logger.info(f"Postal of the event is at {event_postal_code}")
         if not is_valid_postal(event_postal_code):
@@ -96,54 +103,52 @@ def get_event_location(update: Update, context: CallbackContext) -> int:
         search_prompt += f' on *{format_date(context.chat_data["time"])}*'
     search_prompt += f' near *{context.chat_data["location"]["address"]}*...'
     update.message.reply_text(search_prompt, parse_mode=ParseMode.MARKDOWN)
-    events = search_events(context.chat_data['location'], context.chat_data['time'])
+    try:
+        events, next_cursor = search_events_page(
+            context.chat_data['location'], context.chat_data['time'], limit=EVENT_SIZE_PER_PAGE
+        )
+    except (EventsApiUnavailable, requests.HTTPError) as e:
+        logger.warning(f"Could not search events: {e}")
+        update.message.reply_text(SEARCH_UNAVAILABLE_MSG)
+        return ConversationHandler.END
     logger.info(f"{len(events)} events found.")
 
     if not events:
         update.message.reply_text("No events found.")
-    else:
-        for event in events[:EVENT_SIZE_PER_PAGE]:
-            update.message.reply_text(
-                format_event(event),
-                parse_mode=ParseMode.MARKDOWN
-            )
-        if len(events) > EVENT_SIZE_PER_PAGE:
-            context.chat_data['events'] = events
-            context.chat_data['cursor'] = EVENT_SIZE_PER_PAGE
-            update.message.reply_text(
-                MORE_EVENTS_MSG(len(events) - EVENT_SIZE_PER_PAGE),
-                reply_markup=InlineKeyboardMarkup(
-                    [[InlineKeyboardButton(LOAD_MORE_EVENTS_CHOICE, callback_data=LOAD_MORE_EVENTS_CHOICE)]]
-                ),
-            )
-            return LOAD_MORE_EVENTS
-        else:
-            update.message.reply_text(NO_MORE_EVENTS_MSG)
-            return ConversationHandler.END
+        return ConversationHandler.END
 
-def load_more_events(update: Update, context: CallbackContext) -> int:
-    events = context.chat_data['events']
-    cursor = context.chat_data['cursor']
-    start = cursor - 1
-    end = start + EVENT_SIZE_PER_PAGE
-    remaining_events = events[start:]
-    for event in events[start:end]:
-        update.callback_query.message.reply_text(
+    return reply_events_page(update.message, context, events, next_cursor)
+
+def reply_events_page(message, context: CallbackContext, events, next_cursor) -> int:
+    for event in events:
+        message.reply_text(
             format_event(event),
             parse_mode=ParseMode.MARKDOWN
         )
-    if len(remaining_events) > EVENT_SIZE_PER_PAGE:
-        update.callback_query.message.reply_text(
-            MORE_EVENTS_MSG(len(remaining_events) - EVENT_SIZE_PER_PAGE),
+    if next_cursor is not None:
+        context.chat_data['cursor'] = next_cursor
+        message.reply_text(
+            MORE_EVENTS_MSG,
             reply_markup=InlineKeyboardMarkup(
                 [[InlineKeyboardButton(LOAD_MORE_EVENTS_CHOICE, callback_data=LOAD_MORE_EVENTS_CHOICE)]]
             ),
         )
-        context.chat_data['cursor'] += EVENT_SIZE_PER_PAGE
         return LOAD_MORE_EVENTS
     else:
-        update.callback_query.message.reply_text(NO_MORE_EVENTS_MSG)
+        message.reply_text(NO_MORE_EVENTS_MSG)
+        return ConversationHandler.END
+
+def load_more_events(update: Update, context: CallbackContext) -> int:
+    try:
+        events, next_cursor = search_events_page(
+            context.chat_data['location'], context.chat_data['time'],
+            limit=EVENT_SIZE_PER_PAGE, cursor=context.chat_data['cursor']
+        )
+    except (EventsApiUnavailable, requests.HTTPError) as e:
+        logger.warning(f"Could not load more events: {e}")
+        update.callback_query.message.reply_text(SEARCH_UNAVAILABLE_MSG)
         return ConversationHandler.END
+    return reply_events_page(update.callback_query.message, context, events, next_cursor)
 
 def cancel(update: Update, context: CallbackContext) -> int:
     user = update.message.from_user
@@ -0,0 +1,96 @@
+"""
+Nearest-neighbour lookups over community clubs and residents' committees.
+
+Places are indexed once per process in a KD-tree over their positions on the unit sphere. Straight-line
+(chord) distance there orders places the same way great-circle distance does, and converts back to it
+exactly, so queries return the haversine distance in km without scanning every place.
+"""
+
+import math
+from functools import lru_cache
+from typing import Generic, List, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+try:
+    from geo import EARTH_RADIUS_KM
+    from reference_data import community_clubs, residents_committees
+except ImportError:  # imported from another bot as listener.spatial_index
+    from listener.geo import EARTH_RADIUS_KM
+    from listener.reference_data import community_clubs, residents_committees
+
+Place = TypeVar('Place')
+
+
+def unit_vectors(lats, lngs) -> np.ndarray:
+    lat, lng = np.radians(lats), np.radians(lngs)
+    return np.column_stack((np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)))
+
+
+def unit_vector(lat: float, lng: float) -> Tuple[float, float, float]:
+    """unit_vectors for a single point, without numpy's per-call overhead."""
+    lat, lng = math.radians(lat), math.radians(lng)
+    return math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat)
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+
+def km_to_chord(km: float) -> float:
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class SpatialIndex(Generic[Place]):
+    """Places are anything with lat and lng in degrees."""
+
+    def __init__(self, places: Sequence[Place]) -> None:
+        # scipy takes a third of a second to import, so starting the bot doesn't wait for it
+        from scipy.spatial import cKDTree
+
+        self.places = list(places)
+        self.tree = cKDTree(unit_vectors([p.lat for p in self.places], [p.lng for p in self.places]))
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def nearest(self, lat: float, lng: float, k: int = 1) -> List[Tuple[Place, float]]:
+        """The k places nearest (lat, lng), nearest first, with their distance in km."""
+        k = min(k, len(self.places))
+        if k < 1:
+            return []
+        chords, indices = self.tree.query(unit_vector(lat, lng), k=k)
+        if k == 1:
+            return [(self.places[indices], float(chord_to_km(chords)))]
+        return [(self.places[i], float(km)) for i, km in zip(indices.tolist(), chord_to_km(chords).tolist())]
+
+    def nearest_many(self, lats: Sequence[float], lngs: Sequence[float], k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        For a batch of points, the indices into places of the k nearest to each and their distances in km,
+        both shaped (len(lats), k).
+        """
+        k = min(k, len(self.places))
+        chords, indices = self.tree.query(unit_vectors(lats, lngs), k=[*range(1, k + 1)])
+        return indices, chord_to_km(chords)
+
+    def within(self, lat: float, lng: float, radius_km: float) -> List[Tuple[Place, float]]:
+        """Places within radius_km of (lat, lng), nearest first, with their distance in km."""
+        point = unit_vector(lat, lng)
+        indices = self.tree.query_ball_point(point, km_to_chord(radius_km))
+        if not indices:
+            return []
+        chords = np.linalg.norm(self.tree.data[indices] - point, axis=1)
+        return sorted(
+            ((self.places[i], float(km)) for i, km in zip(indices, chord_to_km(chords).tolist())),
+            key=lambda place_km: place_km[1],
+        )
+
+
+@lru_cache(maxsize=None)
+def community_club_index() -> SpatialIndex:
+    return SpatialIndex(community_clubs())
+
+
+@lru_cache(maxsize=None)
+def residents_committee_index() -> SpatialIndex:
+    return SpatialIndex(residents_committees())
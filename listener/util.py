@@ -1,13 +1,19 @@
 from datetime import datetime, timedelta
 import logging
 from dateutil import parser
-from typing import Tuple
+from typing import Optional
 import re
 
-from geopy.geocoders import Nominatim
-from geopy.distance import distance
 from pytz import timezone
-import requests
+
+try:
+    from events_api import events_api
+    from postal_geocoder import postal_geocoder
+    from reverse_geocoder import reverse_geocoder
+except ImportError:  # imported from another bot as listener.util
+    from listener.events_api import events_api
+    from listener.postal_geocoder import postal_geocoder
+    from listener.reverse_geocoder import reverse_geocoder
 
 # Enable logging
 logging.basicConfig(
@@ -23,64 +29,51 @@ def is_valid_postal(postal_code: str) -> bool:
     else:
         return True
 
-def search_postal(postal_code: str) -> Tuple[str, float, float]:
+def search_postal(postal_code: str) -> Optional[dict]:
     """
     :param postal_code:
-    :return: addr, lat, lng
+    :return: address, latitude, longitude, or None when onemap doesn't know the postal code
     """
-    query = {'searchVal': postal_code, 'returnGeom': 'Y', 'getAddrDetails':'Y'}
-    api = 'https://developers.onemap.sg/commonapi/search'
-    response = requests.get(api, params=query)
-    results = response.json()['results']
-    if not results:
-        return None
-    
-    result = results[0]
-    return {
-        'address': result['ADDRESS'].title(),
-        'latitude': result['LATITUDE'],
-        'longitude': result['LONGITUDE']
-    }
+    location = postal_geocoder.search(postal_code)
+    return location._asdict() if location else None
 
-def reverse_geocode(lat, lon):
-    locator = Nominatim(user_agent="kaypohBotGeocoder")
-    location = locator.reverse([lat, lon])
-    postcode = location.raw['address']['postcode']
-    return search_postal(postcode)
+def reverse_geocode(lat, lon) -> Optional[dict]:
+    """
+    :return: address, latitude, longitude of the nearest known address, or None when there is none nearby
+    """
+    location = reverse_geocoder.reverse(lat, lon)
+    return location._asdict() if location else None
 
-def search_events(location, datetime: datetime or None):
-    events = requests.get("http://server:8000/api/events").json()
-    filtered_events = []
+SEARCH_RADIUS_KM = 5
+SG_TIMEZONE = timezone('Asia/Singapore')
 
-    if datetime is None:
-        filtered_events = events
-    else:
-        query_datetime_range = [
-            datetime.replace(tzinfo=None),
-            datetime.replace(hour=23, minute=59, second=59, microsecond=999999).replace(tzinfo=None)
-        ]
-        # Find events based on the datetime of interest
-        for event in events:
-            start_time = parser.parse(event['start_time']).replace(tzinfo=None)
-            end_time = parser.parse(event['end_time']).replace(tzinfo=None)
-            if (start_time >= query_datetime_range[0] and start_time <= query_datetime_range[1]) or \
-                (start_time >= query_datetime_range[0] and end_time <= query_datetime_range[1]):
-                filtered_events.append(event)
-
-    filtered_events = filter_sort_events_by_loc(location, filtered_events)
-
-    return filtered_events
-
-def filter_sort_events_by_loc(location, events):
+def search_params(location, datetime: datetime or None):
+    params = {
+        'lat': float(location['latitude']),
+        'lng': float(location['longitude']),
+        'radius_km': SEARCH_RADIUS_KM,
+    }
+    if datetime is not None:
+        day = SG_TIMEZONE.localize(datetime.replace(tzinfo=None))
+        params['from'] = day.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+        params['to'] = day.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat()
+    return params
+
+def search_events_page(location, datetime: datetime or None, limit: int = None, cursor: str = None):
+    """
+    :return: events, cursor for the next page (None on the last page)
+    """
+    params = search_params(location, datetime)
+    if limit is not None:
+        params['limit'] = limit
+    if cursor is not None:
+        params['cursor'] = cursor
+
+    events, headers = events_api.get_json('/', params)
     for event in events:
-        search_loc = (float(location['latitude']), float(location['longitude']))
-        event_loc = (event['lat'], event['lng'])
-        event['dist'] = distance(event_loc, search_loc).km
+        event['dist'] = event['distance']
 
-    return sorted(
-        filter(lambda event: event['dist'] < 5, events), 
-        key=lambda event: event['dist']
-    )
+    return events, headers.get('X-Next-Cursor')
 
 def format_event(db_event):
     if db_event['category'] == 'independent':
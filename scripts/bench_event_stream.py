@@ -0,0 +1,92 @@
+"""
+Benchmark reading a large onepa dump: json.load against the incremental parser in
+app.background.event_stream. Reports peak traced memory, time to the first event and total time.
+
+The onepa-events.json corpus is repeated --scale times into a temporary dump.
+
+usage: python scripts/bench_event_stream.py --scale 1000
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "backend"))
+
+from app.background.event_stream import iter_events_file  # noqa
+
+path_to_events = ROOT / "data" / "onepa-events.json"
+
+
+def write_dump(path, scale, ndjson):
+    with open(path_to_events) as f:
+        events = json.load(f)
+    with open(path, "w") as f:
+        if not ndjson:
+            f.write("[")
+        for copy in range(scale):
+            for i, event in enumerate(events):
+                event = dict(event, eventId=str(int(event["eventId"]) + copy))
+                if ndjson:
+                    f.write(json.dumps(event) + "\n")
+                else:
+                    f.write(("," if copy or i else "") + json.dumps(event, indent=1))
+        if not ndjson:
+            f.write("]")
+    return scale * len(events)
+
+
+def load_all(path):
+    with open(path) as f:
+        yield from json.load(f)
+
+
+def measure(read, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in read(path):
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "events": count,
+        "peak_mb": round(peak / 2 ** 20, 1),
+        "first_event_ms": round(first * 1000, 1),
+        "seconds": round(seconds, 3),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--scale", type=int, default=1000, help="copies of the onepa corpus")
+    args = arg_parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, ndjson_path = f"{tmp}/events.json", f"{tmp}/events.ndjson"
+        results["events"] = write_dump(json_path, args.scale, ndjson=False)
+        write_dump(ndjson_path, args.scale, ndjson=True)
+        results["dump_mb"] = round(pathlib.Path(json_path).stat().st_size / 2 ** 20, 1)
+
+        for name, read, path in [
+            ("json.load", load_all, json_path),
+            ("stream json", iter_events_file, json_path),
+            ("stream ndjson", iter_events_file, ndjson_path),
+        ]:
+            results[name] = measure(read, path)
+            print(f"{name:>13}: {results[name]}", file=sys.stderr)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
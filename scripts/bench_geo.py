@@ -0,0 +1,150 @@
+"""
+Accuracy and throughput of the distance code the services run, against geopy.
+
+  accuracy    the km listener/spatial_index.py reports vs geopy's geodesic over random pairs of points in
+              Singapore: max and mean absolute error in metres, and max relative error
+  kampongs    events per second assigned their nearest CC and RC by the backend's app.core.kampongs, in
+              ingestion-sized batches, vs a geopy scan of every CC and RC per event
+  index       nearest residents' committee lookups per second, KD-tree vs a numpy scan of every RC, one
+              point at a time and as one batch of top-k, and how often the two disagree
+
+Results are printed as one JSON object.
+
+usage: python scripts/bench_geo.py --pairs 100000 --events 20000
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import random
+import sys
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "listener"))
+sys.path.append(str(ROOT / "backend"))
+# the backend imports listener.geo, which docker-compose mounts inside /backend
+sys.path.append(str(ROOT))
+# both services read data/ relative to the working directory
+os.chdir(ROOT)
+# the backend's config insists on a database url, which nothing here connects to
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "postgresql://unused")
+
+from app.core.config import INGEST_BATCH_SIZE  # noqa
+from app.core.kampongs import assign_kampongs  # noqa
+from app.core.reference_data import community_clubs as backend_community_clubs  # noqa
+from app.core.reference_data import residents_committees as backend_residents_committees  # noqa
+from reference_data import residents_committees  # noqa
+from spatial_index import SpatialIndex, chord_to_km, unit_vectors  # noqa
+
+# roughly the main island
+LAT_RANGE = (1.24, 1.47)
+LNG_RANGE = (103.62, 104.03)
+
+
+def random_points(rng, count):
+    return [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(count)]
+
+
+def rate(count, seconds):
+    return {"count": count, "seconds": round(seconds, 4), "per_second": round(count / seconds) if seconds else None}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def vectors(points):
+    return unit_vectors([lat for lat, _ in points], [lng for _, lng in points])
+
+
+def bench_accuracy(rng, pairs):
+    origins, targets = random_points(rng, pairs), random_points(rng, pairs)
+    expected = np.array([geodesic(a, b).km for a, b in zip(origins, targets)])
+    actual = chord_to_km(np.linalg.norm(vectors(origins) - vectors(targets), axis=1))
+    error = np.abs(actual - expected)
+    return {
+        "pairs": pairs,
+        "max_abs_error_m": round(float(error.max()) * 1000, 2),
+        "mean_abs_error_m": round(float(error.mean()) * 1000, 2),
+        "max_rel_error": round(float((error / expected).max()), 6),
+    }
+
+
+def bench_kampongs(rng, events, geopy_events):
+    points = random_points(rng, events)
+    kampongs = [[(k.lat, k.lng) for k in backend_community_clubs()],
+                [(k.lat, k.lng) for k in backend_residents_committees()]]
+
+    def geopy_scan():
+        return [[min(geodesic(p, k).km for k in group) for group in kampongs] for p in points[:geopy_events]]
+
+    def batched():
+        return [assign_kampongs(points[i:i + INGEST_BATCH_SIZE]) for i in range(0, len(points), INGEST_BATCH_SIZE)]
+
+    _, geopy_seconds = timed(geopy_scan)
+    assign_kampongs(points[:1])
+    _, numpy_seconds = timed(batched)
+    return {
+        "kampongs": sum(len(group) for group in kampongs),
+        "batch_size": INGEST_BATCH_SIZE,
+        "geopy_scan": rate(geopy_events, geopy_seconds),
+        "numpy_batches": rate(events, numpy_seconds),
+    }
+
+
+def bench_index(rng, lookups, k):
+    rcs = residents_committees()
+    points = random_points(rng, lookups)
+    rc_vectors = vectors([(rc.lat, rc.lng) for rc in rcs])
+    index, build_seconds = timed(lambda: SpatialIndex(rcs))
+
+    point_vectors = vectors(points)
+    scanned, scan_seconds = timed(
+        lambda: [int(np.argmin(np.linalg.norm(rc_vectors - v, axis=1))) for v in point_vectors]
+    )
+    indexed, index_seconds = timed(lambda: [index.nearest(*p)[0][0] for p in points])
+    _, scan_batch_seconds = timed(lambda: np.argsort(
+        np.linalg.norm(point_vectors[:, np.newaxis, :] - rc_vectors[np.newaxis, :, :], axis=2), axis=1
+    )[:, :k])
+    lats, lngs = [lat for lat, _ in points], [lng for _, lng in points]
+    _, index_batch_seconds = timed(lambda: index.nearest_many(lats, lngs, k=k))
+    return {
+        "residents_committees": len(rcs),
+        "build_ms": round(build_seconds * 1000, 2),
+        "scan_nearest": rate(lookups, scan_seconds),
+        "index_nearest": rate(lookups, index_seconds),
+        "scan_batch_top_k": rate(lookups, scan_batch_seconds),
+        "index_batch_top_k": rate(lookups, index_batch_seconds),
+        "k": k,
+        "disagreements": sum(rcs[i] != rc for i, rc in zip(scanned, indexed)),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--pairs", type=int, default=20_000, help="random pairs for the accuracy report")
+    arg_parser.add_argument("--events", type=int, default=20_000, help="events assigned kampongs with numpy")
+    arg_parser.add_argument("--geopy-events", type=int, default=10, help="events assigned kampongs with geopy")
+    arg_parser.add_argument("--lookups", type=int, default=10_000, help="points for the index lookups")
+    arg_parser.add_argument("--k", type=int, default=3, help="places per top-k lookup")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {
+        "accuracy": bench_accuracy(rng, args.pairs),
+        "kampongs": bench_kampongs(rng, args.events, min(args.geopy_events, args.events)),
+        "index": bench_index(rng, args.lookups, args.k),
+    }
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+End-to-end ingestion and query benchmark over a corpus from scripts/generate_events.py.
+
+Stages, each timed separately:
+  parse_event_times  startDate/sessionTime parsing of every onepa event
+  map_coords         outlet matching, cold (fresh matcher) and warm (memoised)
+  db_write           POST /api/events/bulk in batches, onepa then bot-created events
+  queries            GET /api/events in several query shapes at random points, plus /nearest
+
+db_write and queries need a running API at --api-url, which should start empty; pass --api-url ''
+to run only the offline stages. Results are printed as one JSON object for comparing runs.
+
+usage: python scripts/bench_ingestion.py --onepa data/synthetic/onepa-events.ndjson \
+           --bot data/synthetic/bot-events.ndjson --api-url http://localhost:8000/api/events
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "backend"))
+# scrape_onepa reads data/ relative to the working directory, and config wants a database url
+os.chdir(ROOT)
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "postgresql://unused")
+
+from app.background import scrape_onepa  # noqa
+from app.background.event_stream import batched, iter_events_file  # noqa
+from app.background.outlet_matcher import OutletMatcher  # noqa
+from app.core.reference_data import community_clubs, rc_name_coords  # noqa
+from app.models.ingestion import IngestionState  # noqa
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def rate(count, seconds):
+    return {"count": count, "seconds": round(seconds, 3), "per_second": round(count / seconds, 1) if seconds else None}
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def bench_parse_event_times(events):
+    def parse():
+        parsed = 0
+        for event in events:
+            try:
+                scrape_onepa.parse_event_times(event["startDate"], event["sessionTime"])
+                parsed += 1
+            except (KeyError, ValueError):
+                pass
+        return parsed
+    parsed, seconds = timed(parse)
+    return rate(parsed, seconds)
+
+
+def bench_map_coords(events):
+    # a matcher without a memo file, so the cold pass really is cold and nothing is written to data/
+    matcher = OutletMatcher(rc_name_coords())
+    scrape_onepa.outlet_matcher = lambda: matcher
+    outlets = [event["outlet"] for event in events]
+    matched, cold_seconds = timed(lambda: sum(scrape_onepa.map_coords(outlet) is not None for outlet in outlets))
+    _, warm_seconds = timed(lambda: [scrape_onepa.map_coords(outlet) for outlet in outlets])
+    return {
+        "distinct_outlets": len(set(outlets)),
+        "matched": matched,
+        "cold": rate(len(outlets), cold_seconds),
+        "warm": rate(len(outlets), warm_seconds),
+    }
+
+
+def post_batches(api_url, events, batch_size):
+    latencies = []
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    start = time.perf_counter()
+    for batch in batched(events, batch_size):
+        response, seconds = timed(lambda: requests.post(f"{api_url}/bulk", json={"new_events": batch}))
+        response.raise_for_status()
+        latencies.append(seconds)
+        for key, value in response.json().items():
+            counts[key] += value
+    total = sum(counts.values())
+    return dict(rate(total, time.perf_counter() - start), batch_size=batch_size,
+                batch_latency=latency_summary(latencies), **counts)
+
+
+def bench_db_write(api_url, onepa_events, bot_events, batch_size):
+    # the benchmark times each stage itself, so the run has no deadline
+    run = scrape_onepa.IngestionRun(IngestionState(), {}, scrape_onepa.Deadline(float("inf")))
+    onepa_rows = list(scrape_onepa.located_events(scrape_onepa.timed_events(
+        scrape_onepa.changed_events(onepa_events, run), run), run))
+    results = {"onepa": post_batches(api_url, onepa_rows, batch_size)}
+    # the same batches again, which the upsert should find unchanged
+    results["onepa_repeat"] = post_batches(api_url, onepa_rows, batch_size)
+    if bot_events:
+        results["bot"] = post_batches(api_url, bot_events, batch_size)
+    return results
+
+
+def query_shapes(rng, first_day, days):
+    """name -> function building random params for that shape"""
+    kampongs = [cc.name for cc in community_clubs()]
+
+    def window():
+        start = first_day + timedelta(days=rng.randrange(days))
+        return {"from": start.isoformat(), "to": (start + timedelta(days=7)).isoformat()}
+
+    def point():
+        return {"lat": round(rng.uniform(1.28, 1.44), 5), "lng": round(rng.uniform(103.70, 103.95), 5)}
+
+    return {
+        "time_window": lambda: dict(window(), limit=50),
+        "radius": lambda: dict(point(), radius_km=2, limit=50),
+        "radius_window_category": lambda: dict(point(), **window(), radius_km=5, category="official", limit=50),
+        "kampong": lambda: dict(window(), kampong=rng.choice(kampongs), limit=50),
+        "page_walk": lambda: dict(window(), limit=20),
+        "stream": lambda: dict(window(), stream="true"),
+    }
+
+
+def bench_queries(api_url, queries, seed, first_day, days):
+    rng = random.Random(seed)
+    session = requests.Session()
+    results = {}
+    for name, make_params in query_shapes(rng, first_day, days).items():
+        latencies = []
+        rows = 0
+        for _ in range(queries):
+            params = make_params()
+            pages = 3 if name == "page_walk" else 1
+            for _ in range(pages):
+                response, seconds = timed(lambda: session.get(f"{api_url}/", params=params))
+                response.raise_for_status()
+                latencies.append(seconds)
+                rows += len(response.content.splitlines()) if name == "stream" else len(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+                params = dict(params, cursor=cursor)
+        results[name] = dict(latency_summary(latencies), rows=rows)
+
+    latencies = []
+    for _ in range(queries):
+        params = {"lat": round(rng.uniform(1.28, 1.44), 5), "lng": round(rng.uniform(103.70, 103.95), 5), "k": 5}
+        response, seconds = timed(lambda: session.get(f"{api_url}/nearest", params=params))
+        response.raise_for_status()
+        latencies.append(seconds)
+    results["nearest"] = latency_summary(latencies)
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--onepa", default="data/synthetic/onepa-events.ndjson", help="onepa-shaped dump")
+    arg_parser.add_argument("--bot", default=None, help="bot-created events, NDJSON")
+    arg_parser.add_argument("--api-url", default="http://localhost:8000/api/events")
+    arg_parser.add_argument("--batch-size", type=int, default=500)
+    arg_parser.add_argument("--queries", type=int, default=50, help="requests per query shape")
+    arg_parser.add_argument("--start", type=datetime.fromisoformat, default=None,
+                            help="first day of the corpus, for query windows; today by default")
+    arg_parser.add_argument("--days", type=int, default=180)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--out", default=None, help="also write the results here")
+    args = arg_parser.parse_args()
+
+    onepa_events = list(iter_events_file(args.onepa))
+    bot_events = list(iter_events_file(args.bot)) if args.bot else []
+    first_day = (args.start or datetime.now(timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+    if first_day.tzinfo is None:
+        first_day = first_day.replace(tzinfo=timezone.utc)
+
+    results = {
+        "onepa_events": len(onepa_events),
+        "bot_events": len(bot_events),
+        "parse_event_times": bench_parse_event_times(onepa_events),
+        "map_coords": bench_map_coords(onepa_events),
+    }
+    print(f"offline stages: {json.dumps(results)}", file=sys.stderr)
+    if args.api_url:
+        results["db_write"] = bench_db_write(args.api_url, onepa_events, bot_events, args.batch_size)
+        results["queries"] = bench_queries(args.api_url, args.queries, args.seed, first_day, args.days)
+
+    output = json.dumps(results)
+    if args.out:
+        pathlib.Path(args.out).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Replays N concurrent /join conversations through the listener's handlers, first on the default one update
+at a time dispatcher and then on ConcurrentDispatcher.
+
+Each conversation is /join, a name, a postal code, confirming the address and taking the pledge. Updates
+from all conversations arrive interleaved and at once. OneMap is stubbed with --onemap-latency-ms per postal
+code, Bot API calls with --bot-latency-ms, and every postal code is distinct so nothing is cached.
+
+Reported per dispatcher: wall time, updates per second, p50/p95/max time until a conversation got its
+group link, and whether every conversation finished with its replies in order. Results are one JSON object.
+
+usage: python scripts/bench_listener_concurrency.py --conversations 50 --workers 8
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import threading
+import time
+import warnings
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "listener"))
+# reference_data reads data/ relative to the working directory
+os.chdir(ROOT)
+warnings.filterwarnings("ignore", message="If 'per_message=False'")
+
+from telegram import Bot, Update  # noqa
+from telegram.ext import Dispatcher  # noqa
+from telegram.utils.request import Request  # noqa
+
+import main_bot  # noqa
+import matching  # noqa
+from concurrent_dispatcher import ConcurrentDispatcher  # noqa
+from postal_geocoder import Location, SqliteCache, postal_geocoder  # noqa
+from spatial_index import community_club_index, residents_committee_index  # noqa
+
+# the replies each conversation should get, in order
+EXPECTED_REPLIES = ["Har-lo!", "👋", "Does this *address* look right?", "We found your kampong", "Join in"]
+
+
+class StubOneMap:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def search(self, postal_code):
+        time.sleep(self.latency)
+        return Location(f"Blk {postal_code} Bench Road", "1.3521", "103.8198")
+
+
+class LocalRequest(Request):
+    """Answers Bot API calls locally after --bot-latency-ms, recording the messages sent to each chat."""
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.replies = {}
+        self.finished_at = {}
+
+    def post(self, url, data, timeout=None):
+        time.sleep(self.latency)
+        method = url.rsplit("/", 1)[-1]
+        if method == "answerCallbackQuery":
+            return True
+        if method == "getMe":
+            return {"id": 123456, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        chat_id = data["chat_id"]
+        with self.lock:
+            self.replies.setdefault(chat_id, []).append(data["text"])
+            if data["text"].startswith(EXPECTED_REPLIES[-1]):
+                self.finished_at[chat_id] = time.perf_counter()
+        return {"message_id": 1, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"},
+                "text": data["text"]}
+
+
+def conversation(chat_id, update_ids):
+    user = {"id": chat_id, "is_bot": False, "first_name": f"resident{chat_id}"}
+    chat = {"id": chat_id, "type": "private"}
+
+    def message(text):
+        message = {"message_id": next(update_ids), "date": 0, "chat": chat, "from": user, "text": text}
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        return {"update_id": next(update_ids), "message": message}
+
+    def callback(data):
+        bot_message = {"message_id": next(update_ids), "date": 0, "chat": chat, "text": "..."}
+        return {"update_id": next(update_ids), "callback_query": {
+            "id": str(next(update_ids)), "from": user, "chat_instance": str(chat_id), "data": data,
+            "message": bot_message,
+        }}
+
+    return [
+        message("/join"),
+        message(f"resident{chat_id}"),
+        message(f"{chat_id % 1_000_000:06d}"),
+        callback(matching.ADDR_CONFIRMATION_POSITIVE),
+        callback(matching.PLEDGE_CONFIRMATION_POSITIVE),
+    ]
+
+
+def interleaved(conversations):
+    """Each conversation's updates in order, with the conversations taking turns."""
+    return [update for step in zip(*conversations) for update in step]
+
+
+def replay(name, dispatcher, request, updates, chat_ids):
+    start = time.perf_counter()
+    for update in updates:
+        dispatcher.process_update(Update.de_json(update, dispatcher.bot))
+    if isinstance(dispatcher, ConcurrentDispatcher):
+        dispatcher.chat_executor.join()
+    seconds = time.perf_counter() - start
+
+    in_order = all(
+        len(request.replies.get(chat_id, [])) == len(EXPECTED_REPLIES)
+        and all(reply.startswith(expected) for reply, expected in zip(request.replies[chat_id], EXPECTED_REPLIES))
+        for chat_id in chat_ids
+    )
+    completions = sorted(request.finished_at[chat_id] - start for chat_id in chat_ids if chat_id in request.finished_at)
+    result = {
+        "seconds": round(seconds, 3),
+        "updates_per_second": round(len(updates) / seconds, 1),
+        "finished": len(completions),
+        "replies_in_order": in_order,
+    }
+    if completions:
+        result["conversation_ms"] = {
+            "p50": round(statistics.median(completions) * 1000, 1),
+            "p95": round(completions[int(0.95 * (len(completions) - 1))] * 1000, 1),
+            "max": round(completions[-1] * 1000, 1),
+        }
+    if isinstance(dispatcher, ConcurrentDispatcher):
+        metrics = dispatcher.chat_executor.metrics()
+        result["max_queue_depths"] = metrics["max_queue_depths"]
+        result["latency"] = metrics["latency"]
+    print(f"{name:>10}: {json.dumps(result)}", file=sys.stderr)
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--conversations", type=int, default=50)
+    arg_parser.add_argument("--workers", type=int, default=8)
+    arg_parser.add_argument("--onemap-latency-ms", type=float, default=100)
+    arg_parser.add_argument("--bot-latency-ms", type=float, default=20)
+    args = arg_parser.parse_args()
+
+    postal_geocoder.backend = StubOneMap(args.onemap_latency_ms / 1000)
+    postal_geocoder._disk = SqliteCache(":memory:")
+    # built here rather than inside the first conversation that needs them
+    community_club_index(), residents_committee_index()
+
+    results = {"conversations": args.conversations, "workers": args.workers}
+    for name, chat_id_base, make_dispatcher in [
+        ("serial", 100_000, lambda bot: Dispatcher(bot, None, workers=0)),
+        ("concurrent", 200_000, lambda bot: ConcurrentDispatcher(bot, None, workers=0, chat_workers=args.workers)),
+    ]:
+        request = LocalRequest(args.bot_latency_ms / 1000)
+        dispatcher = make_dispatcher(Bot("123456:bench", request=request))
+        main_bot.add_handlers(dispatcher)
+        update_ids = iter(range(chat_id_base * 10, chat_id_base * 20))
+        chat_ids = [chat_id_base + i for i in range(args.conversations)]
+        updates = interleaved([conversation(chat_id, update_ids) for chat_id in chat_ids])
+        results[name] = replay(name, dispatcher, request, updates, chat_ids)
+        if isinstance(dispatcher, ConcurrentDispatcher):
+            dispatcher.chat_executor.shutdown()
+
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
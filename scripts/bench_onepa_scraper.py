@@ -0,0 +1,89 @@
+"""
+Benchmark the onepa scraper against the local fixture server: pages a second at increasing concurrency,
+and a check that every event the server holds was scraped exactly once.
+
+usage: python scripts/bench_onepa_scraper.py --scale 20 --latency-ms 50 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "backend"))
+sys.path.append(str(ROOT / "scripts"))
+
+from app.background.onepa_scraper import OnepaScraper  # noqa
+from app.background.scrape_onepa import CATEGORIES  # noqa
+from onepa_fixture_server import SEARCH_PATH, make_app, make_corpus  # noqa
+
+
+async def run(by_category, concurrency, args):
+    app = make_app(by_category, latency_ms=args.latency_ms, error_rate=args.error_rate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scraper = OnepaScraper(
+            search_url=f"http://127.0.0.1:{port}{SEARCH_PATH}",
+            max_concurrent_requests=concurrency,
+            requests_per_second=args.requests_per_second,
+            max_retries=8,
+            cursor_path=f"{tmp}/cursor.ndjson",
+        )
+        start = time.perf_counter()
+        events = await scraper.scrape(CATEGORIES)
+        seconds = time.perf_counter() - start
+    await runner.cleanup()
+
+    expected = {event["eventId"] for events in by_category.values() for event in events}
+    scraped = [event["eventId"] for event in events]
+    assert len(scraped) == len(set(scraped)), "duplicate events"
+    assert set(scraped) == expected, f"{len(expected - set(scraped))} events missing"
+    pages = scraper.requests - scraper.retries
+    return {
+        "concurrency": concurrency,
+        "events": len(events),
+        "pages": pages,
+        "requests": scraper.requests,
+        "retries": scraper.retries,
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(pages / seconds, 1),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--scale", type=int, default=20, help="copies of the onepa corpus")
+    arg_parser.add_argument("--latency-ms", type=int, default=50, help="fixture server delay per response")
+    arg_parser.add_argument("--error-rate", type=float, default=0.05, help="fraction of requests answered with 503")
+    arg_parser.add_argument("--requests-per-second", type=float, default=1000, help="scraper politeness limit")
+    arg_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    by_category = make_corpus(CATEGORIES, args.scale)
+    results = []
+    for concurrency in args.concurrency:
+        result = asyncio.run(run(by_category, concurrency, args))
+        print(
+            f"concurrency {concurrency:>3}: {result['pages']} pages in {result['seconds']:.2f}s, "
+            f"{result['pages_per_second']} pages/s, {result['retries']} retries",
+            file=sys.stderr,
+        )
+        results.append(result)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark encoding of GET /api/events responses: the pydantic path (EventsInDB -> EventsPublic ->
+jsonable_encoder -> json) against EventRow + orjson.
+
+The onepa-events.json corpus is repeated --scale times and shaped like database records.
+
+usage: python scripts/bench_serialisation.py --scale 1000
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa
+
+from app.core.serialisation import encode_event_rows  # noqa
+from app.models.events import EventRow, EventsInDB, EventsPublic  # noqa
+
+path_to_events = ROOT / "data" / "onepa-events.json"
+
+
+def make_records(scale):
+    with open(path_to_events) as f:
+        events = json.load(f)
+
+    records = []
+    for copy in range(scale):
+        for i, event in enumerate(events):
+            start_date = event["startDate"].split(" - ")[0]
+            start_time = datetime.strptime(start_date, "%d %b %Y").replace(tzinfo=timezone.utc)
+            records.append({
+                "id": copy * len(events) + i,
+                "start_time": start_time,
+                "end_time": start_time + timedelta(hours=2),
+                "name": event["share"]["title"],
+                "category": "official",
+                "description": event["share"]["description"],
+                "url": event["share"]["url"],
+                "organizer": event["organisingCommitteeName"],
+                "onepa_eventid": int(event["eventId"]) + copy,
+                "address": event["outlet"],
+                "lat": 1.3 + i / 1000,
+                "lng": 103.8 + i / 1000,
+                "distance": i / 10,
+                "cc_name": event["outlet"],
+                "cc_distance_km": i / 100,
+                "rc_name": None,
+                "rc_distance_km": None,
+            })
+    return records
+
+
+def pydantic_path(records):
+    events = [EventsInDB(**dict(r)) for r in records]
+    public_events = [EventsPublic(**event.dict()) for event in events]
+    return json.dumps(jsonable_encoder(public_events)).encode()
+
+
+def fast_path(records):
+    return encode_event_rows([EventRow.from_record(r) for r in records])
+
+
+def bench(fn, records, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(records)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--scale", type=int, default=1000, help="copies of the onepa corpus")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="runs per path, the best is reported")
+    args = arg_parser.parse_args()
+
+    records = make_records(args.scale)
+    assert json.loads(pydantic_path(records[:100])) == json.loads(fast_path(records[:100])), "outputs differ"
+
+    results = {"rows": len(records)}
+    for name, fn in [("pydantic", pydantic_path), ("fast", fast_path)]:
+        seconds = bench(fn, records, args.repeat)
+        results[name] = {"seconds": round(seconds, 4), "rows_per_second": round(len(records) / seconds)}
+        print(f"{name:>8}: {len(records)} rows in {seconds:.3f}s, {len(records) / seconds:,.0f} rows/s", file=sys.stderr)
+
+    results["speedup"] = round(results["pydantic"]["seconds"] / results["fast"]["seconds"], 1)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Cold start benchmark, each measurement in a fresh interpreter:
+  bots  import time of the bot module, and time from interpreter start until the first update has been
+        handled by a dispatcher set up like the bot's own. Bot API calls are answered locally.
+  api   import time of app.api.server, and time until uvicorn answers GET /health at all and with 200.
+        /health needs the database, so without one the API never reports ready.
+
+Medians over --runs are printed as one JSON object.
+
+usage: python scripts/bench_startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+BOT_SNIPPET = '''
+import json, sys, time
+start = time.perf_counter()
+import {module} as bot_module
+imported = time.perf_counter()
+
+from telegram import Bot, Update
+from telegram.ext import Dispatcher
+from telegram.utils.request import Request
+
+calls = []
+
+class LocalRequest(Request):
+    """Answers every Bot API call locally instead of sending it to telegram."""
+    def post(self, url, data, timeout=None):
+        calls.append(url.rsplit("/", 1)[-1])
+        chat = {{"id": data.get("chat_id", 1), "type": "private"}}
+        return {{"message_id": len(calls), "date": int(time.time()), "chat": chat, "text": data.get("text", "")}}
+
+bot = Bot("123456:bench", request=LocalRequest())
+dispatcher = Dispatcher(bot, None, workers=0)
+bot_module.add_handlers(dispatcher)
+dispatcher.process_update(Update.de_json({update}, bot))
+handled = time.perf_counter()
+print(json.dumps({{"import_seconds": imported - start, "first_update_seconds": handled - start, "bot_calls": calls}}))
+'''
+
+API_IMPORT_SNIPPET = '''
+import json, time
+start = time.perf_counter()
+import app.api.server
+print(json.dumps({"import_seconds": time.perf_counter() - start}))
+'''
+
+
+def message_update(text):
+    message = {
+        "message_id": 1, "date": 0, "text": text,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "bench", "username": "bench"},
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": 1, "message": message}
+
+
+BOTS = {
+    "listener": {"cwd": ROOT / "listener", "module": "main_bot", "update": message_update("/help")},
+    # a plain message goes to the moderator handler
+    "broadcaster": {"cwd": ROOT / "broadcaster", "module": "broadcaster_bot", "update": message_update("hello")},
+}
+
+BOT_ENV = {"EVENT_AGGREGATION_INTERVAL": "60", "MODERATOR_USERID": "1"}
+
+
+def run_snippet(snippet, cwd, env):
+    output = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=cwd, env=dict(os.environ, **env),
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_bot(name, runs):
+    bot = BOTS[name]
+    snippet = BOT_SNIPPET.format(module=bot["module"], update=repr(bot["update"]))
+    results = [run_snippet(snippet, bot["cwd"], BOT_ENV) for _ in range(runs)]
+    if not results[0]["bot_calls"]:
+        raise RuntimeError(f"{name} handled its first update without replying")
+    return {
+        "import_seconds": round(statistics.median(r["import_seconds"] for r in results), 3),
+        "first_update_seconds": round(statistics.median(r["first_update_seconds"] for r in results), 3),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def api_startup(timeout):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "backend"))
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.api.server:app", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_response = ready = status = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                status = requests.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code
+            except requests.ConnectionError:
+                time.sleep(0.02)
+                continue
+            first_response = first_response or time.perf_counter() - start
+            if status == 200:
+                ready = time.perf_counter() - start
+                break
+            time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"first_response_seconds": first_response, "ready_seconds": ready, "health_status": status}
+
+
+def bench_api(runs, ready_timeout):
+    env = {"PYTHONPATH": str(ROOT / "backend")}
+    imports = [run_snippet(API_IMPORT_SNIPPET, ROOT, env)["import_seconds"] for _ in range(runs)]
+    startups = [api_startup(ready_timeout) for _ in range(runs)]
+
+    def median(key):
+        values = [s[key] for s in startups if s[key] is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    return {
+        "import_seconds": round(statistics.median(imports), 3),
+        "first_response_seconds": median("first_response_seconds"),
+        "ready_seconds": median("ready_seconds"),
+        "health_status": startups[-1]["health_status"],
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--ready-timeout", type=float, default=5, help="seconds to wait for /health to be 200")
+    arg_parser.add_argument("--only", choices=[*BOTS, "api"], nargs="+", default=[*BOTS, "api"])
+    args = arg_parser.parse_args()
+
+    results = {}
+    for name in args.only:
+        results[name] = bench_api(args.runs, args.ready_timeout) if name == "api" else bench_bot(name, args.runs)
+        print(f"{name:>11}: {results[name]}", file=sys.stderr)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Generate a synthetic event corpus for scaling benchmarks.
+
+OnePA-shaped events take their outlets from data/rc_name_coords.csv, written as onepa does (&amp;,
+odd spacing and casing) and sometimes as an outlet no community club matches. A quarter of them run
+over several days. Bot-created events are in the POST /api/events shape, at jittered RC locations.
+Output is deterministic for a given --seed and is written as it is generated.
+
+usage: python scripts/generate_events.py --count 100000 --onepa-out data/synthetic/onepa-100k.ndjson \
+           --bot-count 10000 --bot-out data/synthetic/bot-10k.ndjson
+"""
+
+import argparse
+import csv
+import json
+import pathlib
+import random
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+path_to_rcs = ROOT / "data" / "rc_name_coords.csv"
+
+FIRST_EVENT_ID = 90_000_000
+MULTIDAY_FRACTION = 0.25
+UNMATCHED_FRACTION = 0.05
+UNMATCHED_OUTLETS = ["Online", "Virtual Event", "Islandwide", "Various Locations", "Zoom"]
+ACTIVITIES = [
+    "Terrarium Workshop", "Line Dance", "Zumba Gold", "Kopi Talk", "Health Screening", "Mahjong Social",
+    "Baking Class", "Tai Chi", "Heritage Walk", "Durian Party", "Coding for Kids", "Blood Donation Drive",
+    "Karaoke Night", "Mooncake Making", "Gardening Club", "Financial Literacy Talk",
+]
+AUDIENCES = ["for Seniors", "for Families", "for Youths", "for Residents", "", ""]
+SESSION_TIME_FORMAT = "%I:%M %p"
+START_DATE_FORMAT = "%d %b %Y"
+
+
+def load_rcs():
+    with open(path_to_rcs) as f:
+        return [(row["name"], float(row["lat"]), float(row["long"])) for row in csv.DictReader(f)]
+
+
+def outlet_as_written(rng, name):
+    """How onepa might spell an outlet name."""
+    roll = rng.random()
+    if roll < UNMATCHED_FRACTION:
+        return rng.choice(UNMATCHED_OUTLETS)
+    if roll < 0.15:
+        return name.replace("&", "&amp;")
+    if roll < 0.2:
+        return name.upper()
+    if roll < 0.25:
+        return name.replace(" ", "  ", 1)
+    return name
+
+
+def session_time(rng):
+    start = rng.randint(7, 20)
+    end = min(start + rng.randint(1, 4), 23)
+    return " - ".join(datetime(2022, 1, 1, hour).strftime(SESSION_TIME_FORMAT) for hour in (start, end))
+
+
+def start_date(rng, first_day, days):
+    start = first_day + timedelta(days=rng.randrange(days))
+    if rng.random() < MULTIDAY_FRACTION:
+        end = start + timedelta(days=rng.randint(1, 5))
+        return f"{start.strftime(START_DATE_FORMAT)} - {end.strftime(START_DATE_FORMAT)}"
+    return start.strftime(START_DATE_FORMAT)
+
+
+def title(rng):
+    return " ".join(filter(None, [rng.choice(ACTIVITIES), rng.choice(AUDIENCES)]))
+
+
+def onepa_event(rng, i, rcs, first_day, days):
+    name, _, _ = rng.choice(rcs)
+    outlet = outlet_as_written(rng, name)
+    event_id = str(FIRST_EVENT_ID + i)
+    event_title = title(rng)
+    slug = "-".join(event_title.lower().split())
+    return {
+        "name": "",
+        "eventId": event_id,
+        "type": "Event",
+        "outlet": outlet,
+        "outletId": "".join(outlet.lower().split()),
+        "title": event_title,
+        "favorite": False,
+        "price": {"discount": True, "publicPrice": None, "membersPrice": None, "minPrice": 0.0, "maxPrice": 0.0,
+                  "discountTitle": ""},
+        "isRegistrationOpen": True,
+        "registrationOpeningDate": first_day.strftime(START_DATE_FORMAT),
+        "favoriteID": f"{''.join(outlet.lower().split())}_{event_id}",
+        "sessionTime": session_time(rng),
+        "totalVacancies": 0,
+        "availableVacancies": 0,
+        "share": {"image": None, "title": event_title, "description": f"{event_title} at {outlet}",
+                  "url": f"https://www.onepa.gov.sg/events/{slug}-{event_id}"},
+        "isSameDayEvent": False,
+        "startDate": start_date(rng, first_day, days),
+        "outletUrl": f"/cc/{slug}",
+        "organisingCommitteeName": f"{name} CCC",
+        "coOrganisingCommitte": [outlet],
+        "productId": None,
+        "productUrl": f"/events/{slug}-{event_id}",
+        "minPrice": 2.0,
+        "maxPrice": 2.0,
+        "isCategory": False,
+        "allPrices": None,
+        "materialFees": None,
+    }
+
+
+def bot_event(rng, rcs, first_day, days):
+    name, lat, lng = rng.choice(rcs)
+    start = datetime.combine(first_day, datetime.min.time(), tzinfo=timezone.utc) + \
+        timedelta(days=rng.randrange(days), hours=rng.randint(0, 14))
+    event_title = title(rng)
+    return {
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=rng.randint(1, 3))).isoformat(),
+        "name": event_title,
+        "category": "independent",
+        "description": f"{event_title} with the neighbours",
+        # within a few hundred metres of the RC
+        "lat": round(lat + rng.uniform(-0.003, 0.003), 6),
+        "lng": round(lng + rng.uniform(-0.003, 0.003), 6),
+        "address": f"Void deck near {name}",
+        "url": None,
+        "organizer": f"@resident{rng.randrange(10_000)}",
+        "onepa_eventid": None,
+    }
+
+
+def write_events(path, events):
+    """NDJSON for .ndjson paths, otherwise a JSON array, written one event at a time."""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(path, "w") as f:
+        ndjson = path.suffix == ".ndjson"
+        if not ndjson:
+            f.write("[")
+        for event in events:
+            if ndjson:
+                f.write(json.dumps(event) + "\n")
+            else:
+                f.write(("," if count else "") + json.dumps(event))
+            count += 1
+        if not ndjson:
+            f.write("]")
+    return count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--count", type=int, default=10_000, help="onepa events")
+    arg_parser.add_argument("--onepa-out", default="data/synthetic/onepa-events.ndjson")
+    arg_parser.add_argument("--bot-count", type=int, default=0, help="bot-created events")
+    arg_parser.add_argument("--bot-out", default="data/synthetic/bot-events.ndjson")
+    arg_parser.add_argument("--start", type=date.fromisoformat, default=date.today(), help="first event day")
+    arg_parser.add_argument("--days", type=int, default=180, help="days the events are spread over")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rcs = load_rcs()
+    written = {
+        "onepa": write_events(
+            args.onepa_out, (onepa_event(rng, i, rcs, args.start, args.days) for i in range(args.count))
+        ),
+    }
+    if args.bot_count:
+        written["bot"] = write_events(
+            args.bot_out, (bot_event(rng, rcs, args.start, args.days) for _ in range(args.bot_count))
+        )
+    print(f"Wrote {written}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Local stand-in for the onepa event search API, serving pages built from data/onepa-events.json.
+
+The corpus is repeated --scale times with fresh eventIds, and every event is filed under one or two of the
+scraper's categories. Latency and transient 503s can be injected to exercise concurrency and retries.
+
+usage: python scripts/onepa_fixture_server.py --scale 100 --latency-ms 50 --error-rate 0.05
+then:  ONEPA_LIVE_SCRAPE=true ONEPA_SEARCH_URL=http://localhost:8080/pacesapi/eventsearch/searchjson ...
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import pathlib
+import random
+import sys
+import zlib
+
+from aiohttp import web
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "backend"))
+
+from app.background.onepa_scraper import RESULTS_PER_PAGE  # noqa
+
+SEARCH_PATH = "/pacesapi/eventsearch/searchjson"
+path_to_events = ROOT / "data" / "onepa-events.json"
+
+
+def make_corpus(categories, scale):
+    """
+    category -> events, every eventId appearing under its primary category and some under a second one.
+    """
+    with open(path_to_events) as f:
+        events = json.load(f)
+
+    by_category = {category: [] for category in categories}
+    for copy_index in range(scale):
+        for event in events:
+            event = copy.deepcopy(event)
+            event["eventId"] = str(int(event["eventId"]) + copy_index * 100_000_000)
+            checksum = zlib.crc32(event["eventId"].encode())
+            by_category[categories[checksum % len(categories)]].append(event)
+            if checksum % 3 == 0:
+                by_category[categories[(checksum // 7) % len(categories)]].append(event)
+    return by_category
+
+
+def make_app(by_category, *, latency_ms=0, error_rate=0.0, seed=0):
+    rng = random.Random(seed)
+    app = web.Application()
+    app["requests"] = 0
+    app["errors"] = 0
+
+    async def search(request):
+        app["requests"] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if rng.random() < error_rate:
+            app["errors"] += 1
+            return web.Response(status=503)
+
+        events = by_category.get(request.query.get("aoi", ""), [])
+        page = int(request.query.get("page", 1))
+        results = events[(page - 1) * RESULTS_PER_PAGE:page * RESULTS_PER_PAGE]
+        return web.json_response({"data": {"results": results, "totalResults": len(events)}})
+
+    app.router.add_get(SEARCH_PATH, search)
+    return app
+
+
+def main():
+    from app.background.scrape_onepa import CATEGORIES
+
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--scale", type=int, default=1, help="copies of the onepa corpus")
+    arg_parser.add_argument("--latency-ms", type=int, default=0, help="delay before every response")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = arg_parser.parse_args()
+
+    app = make_app(make_corpus(CATEGORIES, args.scale), latency_ms=args.latency_ms, error_rate=args.error_rate)
+    web.run_app(app, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
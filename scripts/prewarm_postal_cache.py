@@ -0,0 +1,34 @@
+"""
+Fill the listener's postal code cache before the bots start.
+
+The CSV needs a postal_code column. Rows that also give address, latitude and longitude are stored as they
+are, the rest are geocoded through OneMap (or --url, e.g. a local stand-in) unless already cached.
+
+usage: python scripts/prewarm_postal_cache.py postal_codes.csv --cache data/postal_cache.sqlite3
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "listener"))
+
+from postal_geocoder import ONEMAP_SEARCH_URL, POSTAL_CACHE_PATH, OneMapGeocoder, PostalGeocoder, SqliteCache  # noqa
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("path", help="CSV of postal codes")
+    arg_parser.add_argument("--cache", default=POSTAL_CACHE_PATH, help="SQLite cache file")
+    arg_parser.add_argument("--url", default=ONEMAP_SEARCH_URL, help="OneMap search endpoint")
+    args = arg_parser.parse_args()
+
+    geocoder = PostalGeocoder(OneMapGeocoder(args.url), SqliteCache(args.cache))
+    counts = geocoder.prewarm(args.path)
+    print(json.dumps(dict(counts, upstream=geocoder.metrics()["upstream"])))
+
+
+if __name__ == "__main__":
+    main()